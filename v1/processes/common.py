@@ -5,6 +5,7 @@ from numpy.linalg import norm
 from mpi4py import MPI
 
 from ..common import _start, _end
+from ...v3.cpu.common import compress
 
 
 def start(method_name='', k=None):
@@ -77,6 +78,8 @@ def init(A, b, num_of_process, T, pu):
             if num_of_append:
                 A = hstack([A, csr_matrix((old_N, num_of_append))], 'csr') # 右にemptyを追加
                 A = vstack([A, csr_matrix((num_of_append, N))], 'csr') # 下にemptyを追加
+            # 添字をint32にする(パディングでint64になる場合がある)
+            A = compress(A)
         if num_of_append:
             b = np.append(b, np.zeros(num_of_append))  # 0を追加
         x = np.zeros(N, T)
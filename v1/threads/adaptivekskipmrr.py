@@ -1,16 +1,25 @@
 from .common import start, end as finish, init
+from ...v3.cpu.threads import ThreadCpu
 
 
 def adaptivekskipmrr(A, b, epsilon, k, T, pu):
+    if pu == 'cpu':
+        # 行列ベクトル積・内積と解・残差の更新をスレッド並列で計算する(例外でもスレッドを終了する)
+        with ThreadCpu(A) as A:
+            return _adaptivekskipmrr(A, b, epsilon, k, T, pu)
+    return _adaptivekskipmrr(A, b, epsilon, k, T, pu)
+
+
+def _adaptivekskipmrr(A, b, epsilon, k, T, pu):
     if pu == 'cpu':
         import numpy as xp
-        from numpy import dot
-        from numpy.linalg import norm
         x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
+        dot, norm, axpy = A.vdot, A.norm, A.axpy
     else:
         import cupy as xp
         from cupy import dot
         from cupy.linalg import norm
+        from .common import axpy
         A, b, x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
     
     # 初期化
@@ -24,20 +33,20 @@ def adaptivekskipmrr(A, b, epsilon, k, T, pu):
     k_history[0] = k
 
     # 初期残差
-    Ar[0] = b - dot(A, x)
+    Ar[0] = b - A.dot(x)
     residual[0] = norm(Ar[0]) / b_norm
     pre_residual = residual[0]
 
     # 初期反復
     start_time = start(method_name='Adaptive k-skip MrR', k=k)
-    Ar[1] = dot(A, Ar[0])
+    Ar[1] = A.dot(Ar[0])
     rAr = dot(Ar[0], Ar[1])
     ArAr = dot(Ar[1], Ar[1])
     zeta = rAr / ArAr
     Ay[0] = zeta * Ar[1]
     z = -zeta * Ar[0]
-    Ar[0] -= Ay[0]
-    x -= z
+    axpy(-1, Ay[0], Ar[0])
+    axpy(-1, z, x)
     num_of_solution_updates[1] = 1
     k_history[1] = k
     i = 1
@@ -50,15 +59,15 @@ def adaptivekskipmrr(A, b, epsilon, k, T, pu):
         if residual[index] > pre_residual:
             # 残差と解を直前の状態に戻す
             x = pre_x.copy()
-            Ar[0] = b - dot(A, x)
-            Ar[1] = dot(A, Ar[0])
+            Ar[0] = b - A.dot(x)
+            Ar[1] = A.dot(Ar[0])
             rAr = dot(Ar[0], Ar[1])
             ArAr = dot(Ar[1], Ar[1])
             zeta = rAr / ArAr
             Ay[0] = zeta * Ar[1]
             z = -zeta * Ar[0]
-            Ar[0] -= Ay[0]
-            x -= z
+            axpy(-1, Ay[0], Ar[0])
+            axpy(-1, z, x)
 
             i += 1
             index += 1
@@ -80,9 +89,9 @@ def adaptivekskipmrr(A, b, epsilon, k, T, pu):
 
         # 事前計算
         for j in range(1, k + 2):
-            Ar[j] = dot(A, Ar[j-1])
+            Ar[j] = A.dot(Ar[j-1])
         for j in range(1, k + 1):
-            Ay[j] = dot(A, Ay[j-1])
+            Ay[j] = A.dot(Ay[j-1])
         for j in range(2 * k + 3):
             jj = j // 2
             alpha[j] = dot(Ar[jj], Ar[jj + j % 2])
@@ -99,9 +108,9 @@ def adaptivekskipmrr(A, b, epsilon, k, T, pu):
         eta = -alpha[1] * beta[1] / sigma
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
-        Ar[0] -= Ay[0]
-        Ar[1] = dot(A, Ar[0])
-        x -= z
+        axpy(-1, Ay[0], Ar[0])
+        Ar[1] = A.dot(Ar[0])
+        axpy(-1, z, x)
 
         # MrRでのk反復
         for j in range(0, k):
@@ -122,9 +131,9 @@ def adaptivekskipmrr(A, b, epsilon, k, T, pu):
             eta = -alpha[1] * beta[1] / sigma
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
-            Ar[0] -= Ay[0]
-            Ar[1] = dot(A, Ar[0])
-            x -= z
+            axpy(-1, Ay[0], Ar[0])
+            Ar[1] = A.dot(Ar[0])
+            axpy(-1, z, x)
 
         i += (k + 1)
         index += 1
@@ -1,18 +1,27 @@
 from .common import start, end as finish, init
+from ...v3.cpu.threads import ThreadCpu
 
 
 def cg(A, b, epsilon, T, pu):
     if pu == 'cpu':
-        from numpy import dot
-        from numpy.linalg import norm
+        # 行列ベクトル積・内積と解・残差の更新をスレッド並列で計算する(例外でもスレッドを終了する)
+        with ThreadCpu(A) as A:
+            return _cg(A, b, epsilon, T, pu)
+    return _cg(A, b, epsilon, T, pu)
+
+
+def _cg(A, b, epsilon, T, pu):
+    if pu == 'cpu':
         x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
+        dot, norm, axpy = A.vdot, A.norm, A.axpy
     else:
         from cupy import dot
         from cupy.linalg import norm
+        from .common import axpy
         A, b, x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
 
     # 初期残差
-    r = b - dot(A, x)
+    r = b - A.dot(x)
     p = r.copy()
     gamma = dot(r, r)
 
@@ -27,11 +36,11 @@ def cg(A, b, epsilon, T, pu):
             break
 
         # 解の更新
-        v = dot(A, p)
+        v = A.dot(p)
         sigma = dot(p, v)
         alpha = gamma / sigma
-        x += alpha * p
-        r -= alpha * v
+        axpy(alpha, p, x)
+        axpy(-alpha, v, r)
         old_gamma = gamma.copy()
         gamma = dot(r, r)
         beta = gamma / old_gamma
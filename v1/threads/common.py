@@ -55,3 +55,9 @@ def init(A: np.ndarray, b: np.ndarray, T, pu: str) -> tuple:
         return cp.asarray(A), cp.asarray(b), cp.asarray(x), b_norm, N, max_iter, residual, num_of_solution_updates
 
     return x, b_norm, N, max_iter, residual, num_of_solution_updates
+
+
+# y += alpha * x (GPU用. CPUではThreadCpu.axpyでスレッド並列に計算する)
+def axpy(alpha, x, y):
+    y += alpha * x
+    return y
@@ -1,16 +1,25 @@
 from .common import start, end as finish, init
+from ...v3.cpu.threads import ThreadCpu
 
 
 def kskipcg(A, b, epsilon, k, T, pu):
+    if pu == 'cpu':
+        # 行列ベクトル積・内積と解・残差の更新をスレッド並列で計算する(例外でもスレッドを終了する)
+        with ThreadCpu(A) as A:
+            return _kskipcg(A, b, epsilon, k, T, pu)
+    return _kskipcg(A, b, epsilon, k, T, pu)
+
+
+def _kskipcg(A, b, epsilon, k, T, pu):
     if pu == 'cpu':
         import numpy as xp
-        from numpy import dot
-        from numpy.linalg import norm
         x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
+        dot, norm, axpy = A.vdot, A.norm, A.axpy
     else:
         import cupy as xp
         from cupy import dot
         from cupy.linalg import norm
+        from .common import axpy
         A, b, x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
 
     # 初期化
@@ -21,7 +30,7 @@ def kskipcg(A, b, epsilon, k, T, pu):
     c = xp.zeros(2 * k + 2, T)
 
     # 初期残差
-    Ar[0] = b - dot(A, x)
+    Ar[0] = b - A.dot(x)
     Ap[0] = Ar[0]
 
     # 反復計算
@@ -37,9 +46,9 @@ def kskipcg(A, b, epsilon, k, T, pu):
 
         # 事前計算
         for j in range(1, k + 1):
-            Ar[j] = dot(A, Ar[j-1])
+            Ar[j] = A.dot(Ar[j-1])
         for j in range(1, k + 2):
-            Ap[j] = dot(A, Ap[j-1])
+            Ap[j] = A.dot(Ap[j-1])
         for j in range(2 * k + 1):
             jj = j // 2
             a[j] = dot(Ar[jj], Ar[jj + j % 2])
@@ -53,10 +62,10 @@ def kskipcg(A, b, epsilon, k, T, pu):
         # CGでの1反復
         alpha = a[0] / f[1]
         beta = alpha ** 2 * f[2] / a[0] - 1
-        x += alpha * Ap[0]
-        Ar[0] -= alpha * Ap[1]
+        axpy(alpha, Ap[0], x)
+        axpy(-alpha, Ap[1], Ar[0])
         Ap[0] = Ar[0] + beta * Ap[0]
-        Ap[1] = dot(A, Ap[0])
+        Ap[1] = A.dot(Ap[0])
 
         # CGでのk反復
         for j in range(0, k):
@@ -69,10 +78,10 @@ def kskipcg(A, b, epsilon, k, T, pu):
             # 解の更新
             alpha = a[0] / f[1]
             beta = alpha ** 2 * f[2] / a[0] - 1
-            x += alpha * Ap[0]
-            Ar[0] -= alpha * Ap[1]
+            axpy(alpha, Ap[0], x)
+            axpy(-alpha, Ap[1], Ar[0])
             Ap[0] = Ar[0] + beta * Ap[0]
-            Ap[1] = dot(A, Ap[0])
+            Ap[1] = A.dot(Ap[0])
 
         i += (k + 1)
         index += 1
@@ -1,16 +1,25 @@
 from .common import start, end as finish, init
+from ...v3.cpu.threads import ThreadCpu
 
 
 def kskipmrr(A, b, epsilon, k, T, pu):
+    if pu == 'cpu':
+        # 行列ベクトル積・内積と解・残差の更新をスレッド並列で計算する(例外でもスレッドを終了する)
+        with ThreadCpu(A) as A:
+            return _kskipmrr(A, b, epsilon, k, T, pu)
+    return _kskipmrr(A, b, epsilon, k, T, pu)
+
+
+def _kskipmrr(A, b, epsilon, k, T, pu):
     if pu == 'cpu':
         import numpy as xp
-        from numpy import dot
-        from numpy.linalg import norm
         x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
+        dot, norm, axpy = A.vdot, A.norm, A.axpy
     else:
         import cupy as xp
         from cupy import dot
         from cupy.linalg import norm
+        from .common import axpy
         A, b, x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
 
     # 初期化
@@ -22,17 +31,17 @@ def kskipmrr(A, b, epsilon, k, T, pu):
     beta[0] = 0
 
     # 初期残差
-    Ar[0] = b - dot(A, x)
+    Ar[0] = b - A.dot(x)
     residual[0] = norm(Ar[0]) / b_norm
 
     # 初期反復
     start_time = start(method_name=f'k-skip MrR + {pu}', k=k)
-    Ar[1] = dot(A, Ar[0])
+    Ar[1] = A.dot(Ar[0])
     zeta = dot(Ar[0], Ar[1]) / dot(Ar[1], Ar[1])
     Ay[0] = zeta * Ar[1]
     z = -zeta * Ar[0]
-    Ar[0] -= Ay[0]
-    x -= z
+    axpy(-1, Ay[0], Ar[0])
+    axpy(-1, z, x)
     num_of_solution_updates[1] = 1
     i = 1
     index = 1
@@ -47,9 +56,9 @@ def kskipmrr(A, b, epsilon, k, T, pu):
 
         # 基底計算
         for j in range(1, k + 2):
-            Ar[j] = dot(A, Ar[j-1])
+            Ar[j] = A.dot(Ar[j-1])
         for j in range(1, k + 1):
-            Ay[j] = dot(A, Ay[j-1])
+            Ay[j] = A.dot(Ay[j-1])
         
         # 係数計算
         for j in range(2 * k + 3):
@@ -68,9 +77,9 @@ def kskipmrr(A, b, epsilon, k, T, pu):
         eta = -alpha[1] * beta[1] / d
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
-        Ar[0] -= Ay[0]
-        Ar[1] = dot(A, Ar[0])
-        x -= z
+        axpy(-1, Ay[0], Ar[0])
+        Ar[1] = A.dot(Ar[0])
+        axpy(-1, z, x)
 
         # MrRでのk反復
         for j in range(k):
@@ -90,9 +99,9 @@ def kskipmrr(A, b, epsilon, k, T, pu):
             eta = -alpha[1] * beta[1] / d
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
-            Ar[0] -= Ay[0]
-            Ar[1] = dot(A, Ar[0])
-            x -= z
+            axpy(-1, Ay[0], Ar[0])
+            Ar[1] = A.dot(Ar[0])
+            axpy(-1, z, x)
 
         i += (k + 1)
         index += 1
@@ -1,28 +1,37 @@
 from .common import start, end as finish, init
+from ...v3.cpu.threads import ThreadCpu
 
 
 def mrr(A, b, epsilon, T, pu):
     if pu == 'cpu':
-        from numpy import dot
-        from numpy.linalg import norm
+        # 行列ベクトル積・内積と解・残差の更新をスレッド並列で計算する(例外でもスレッドを終了する)
+        with ThreadCpu(A) as A:
+            return _mrr(A, b, epsilon, T, pu)
+    return _mrr(A, b, epsilon, T, pu)
+
+
+def _mrr(A, b, epsilon, T, pu):
+    if pu == 'cpu':
         x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
+        dot, norm, axpy = A.vdot, A.norm, A.axpy
     else:
         from cupy import dot
         from cupy.linalg import norm
+        from .common import axpy
         A, b, x, b_norm, N, max_iter, residual, num_of_solution_updates = init(A, b, T, pu)
 
     # 初期残差
-    r = b - dot(A, x)
+    r = b - A.dot(x)
     residual[0] = norm(r) / b_norm
 
     # 初期反復
     start_time = start(method_name=f'MrR + {pu}')
-    Ar = dot(A, r)
+    Ar = A.dot(r)
     zeta = dot(r, Ar) / dot(Ar, Ar)
     y = zeta * Ar
     z = -zeta * r
-    r -= y
-    x -= z
+    axpy(-1, y, r)
+    axpy(-1, z, x)
     num_of_solution_updates[1] = 1
     i = 1
 
@@ -35,7 +44,7 @@ def mrr(A, b, epsilon, T, pu):
             break
 
         # 解の更新
-        Ar = dot(A, r)
+        Ar = A.dot(r)
         nu = dot(y, Ar)
         mu = dot(y, y)
         gamma = nu / mu
@@ -44,8 +53,8 @@ def mrr(A, b, epsilon, T, pu):
         eta = -zeta * gamma
         y = eta * y + zeta * Ar
         z = eta * z - zeta * r
-        r -= y
-        x -= z
+        axpy(-1, y, r)
+        axpy(-1, z, x)
         i += 1
         num_of_solution_updates[i] = i
     else:
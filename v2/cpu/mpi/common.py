@@ -5,6 +5,7 @@ from numpy.linalg import norm
 from mpi4py import MPI
 
 from ..common import _start, _finish
+from ....v3.cpu.common import compress
 
 
 def start(method_name='', k=None):
@@ -44,6 +45,8 @@ def init(A, b, T, rank, num_of_process):
             if num_of_append:
                 A = hstack([A, csr_matrix((old_N, num_of_append))], 'csr') # 右にemptyを追加
                 A = vstack([A, csr_matrix((num_of_append, N))], 'csr') # 下にemptyを追加
+    # 添字をint32にする(パディングでint64になる場合がある)
+    A = compress(A)
     local_A = A[begin:end]
 
     ## b
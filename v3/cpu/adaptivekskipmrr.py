@@ -2,7 +2,8 @@ import numpy as np
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init
+from .common import start, finish, init, zeros, operator, basis, matvec
+from .timer import Timer, summarize, BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
 def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
@@ -10,8 +11,10 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
 
     # 初期化
-    Ar = np.zeros((k + 3, N), T)
-    Ay = np.zeros((k + 2, N), T)
+    A = operator(A)
+    timer = Timer()
+    Ar = zeros(A, (k + 3, N), T)
+    Ay = zeros(A, (k + 2, N), T)
     alpha = np.zeros(2 * k + 3, T)
     beta = np.zeros(2 * k + 2, T)
     delta = np.zeros(2 * k + 1, T)
@@ -19,13 +22,13 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
     k_history[0] = k
 
     # 初期残差
-    Ar[0] = b - dot(A, x)
+    Ar[0] = b - A.dot(x)
     residual[0] = norm(Ar[0]) / b_norm
     pre_residual = residual[0]
 
     # 初期反復
     start_time = start(method_name='Adaptive k-skip MrR', k=k)
-    Ar[1] = dot(A, Ar[0])
+    matvec(A, Ar[0], Ar[1])
     rAr = dot(Ar[0], Ar[1])
     ArAr = dot(Ar[1], Ar[1])
     zeta = rAr / ArAr
@@ -40,13 +43,16 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
 
     # 反復計算
     while i < maxiter:
+        t = timer.tic()
         residual[index] = norm(Ar[0]) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         # 残差減少判定
         if residual[index] > pre_residual:
             # 残差と解を直前の状態に戻す
             x = pre_x.copy()
-            Ar[0] = b - dot(A, x)
-            Ar[1] = dot(A, Ar[0])
+            Ar[0] = b - A.dot(x)
+            matvec(A, Ar[0], Ar[1])
+            t = timer.toc(BASIS, t)
             rAr = dot(Ar[0], Ar[1])
             ArAr = dot(Ar[1], Ar[1])
             zeta = rAr / ArAr
@@ -54,10 +60,12 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
             z = -zeta * Ar[0]
             Ar[0] -= Ay[0]
             x -= z
+            t = timer.toc(UPDATE, t)
 
             i += 1
             index += 1
             residual[index] = norm(Ar[0]) / b_norm
+            t = timer.toc(CONVERGENCE, t)
             num_of_solution_updates[index] = i
 
             # kを1下げる
@@ -67,6 +75,7 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
         else:
             pre_residual = residual[index]
             pre_x = x.copy()
+            t = timer.toc(UPDATE, t)
 
         # 収束判定
         if residual[index] < tol:
@@ -74,10 +83,8 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
             break
 
         # 事前計算
-        for j in range(1, k + 2):
-            Ar[j] = dot(A, Ar[j-1])
-        for j in range(1, k + 1):
-            Ay[j] = dot(A, Ay[j-1])
+        basis(A, (Ar, k + 1), (Ay, k))
+        t = timer.toc(BASIS, t)
         for j in range(2 * k + 3):
             jj = j // 2
             alpha[j] = dot(Ar[jj], Ar[jj + j % 2])
@@ -87,16 +94,21 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
         for j in range(0, 2 * k + 1):
             jj = j // 2
             delta[j] = dot(Ay[jj], Ay[jj + j % 2])
+        t = timer.toc(COEFFICIENTS, t)
 
         # MrRでの1反復(解の更新)
         sigma = alpha[2] * delta[0] - beta[1] ** 2
         zeta = alpha[1] * delta[0] / sigma
         eta = -alpha[1] * beta[1] / sigma
+        t = timer.toc(RECURRENCE, t)
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
         Ar[0] -= Ay[0]
-        Ar[1] = dot(A, Ar[0])
+        t = timer.toc(UPDATE, t)
+        matvec(A, Ar[0], Ar[1])
+        t = timer.toc(BASIS, t)
         x -= z
+        t = timer.toc(UPDATE, t)
 
         # MrRでのk反復
         for j in range(0, k):
@@ -117,11 +129,15 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
             sigma = alpha[2] * delta[0] - beta[1] ** 2
             zeta = alpha[1] * delta[0] / sigma
             eta = -alpha[1] * beta[1] / sigma
+            t = timer.toc(RECURRENCE, t)
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
             Ar[0] -= Ay[0]
-            Ar[1] = dot(A, Ar[0])
+            t = timer.toc(UPDATE, t)
+            matvec(A, Ar[0], Ar[1])
+            t = timer.toc(BASIS, t)
             x -= z
+            t = timer.toc(UPDATE, t)
 
         i += (k + 1)
         index += 1
@@ -138,4 +154,5 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
         'residual': residual[:index+1],
         'khistory': k_history[:index+1],
     }
+    summarize(info, A, timer, 'adaptivekskipmrr', k)
     return x, info
@@ -0,0 +1,155 @@
+import contextlib
+import importlib
+import io
+import json
+import time
+
+import numpy as np
+import scipy.sparse.linalg
+
+from .common import footprint
+from .zoo import zoo
+
+METHODS = ('cg', 'mrr', 'kskipcg', 'kskipmrr', 'adaptivekskipmrr', 'scipy_cg')
+
+
+class Counter(object):
+    """行列ベクトル積の回数(列数)と時間を数える演算子
+
+    Args:
+        A: 演算子
+    """
+
+    def __init__(self, A):
+        self.A = A
+        self.shape = A.shape
+        self.dtype = A.dtype
+        self.nnz = A.nnz
+        self.count = 0
+        self.time = 0.0
+
+    def dot(self, x, out=None):
+        self.count += 1 if x.ndim == 1 else x.shape[1]
+        start_time = time.perf_counter()
+        y = self.A.dot(x)
+        self.time += time.perf_counter() - start_time
+        if out is None:
+            return y
+        out[...] = y
+        return out
+
+    matvec = dot
+    matmat = dot
+
+
+# scipyのcg(基準)
+def _scipy_cg(A, b, tol, maxiter):
+    iterations = [0]
+
+    def callback(_):
+        iterations[0] += 1
+    try:
+        x, status = scipy.sparse.linalg.cg(A, b, rtol=tol, maxiter=maxiter, callback=callback)
+    except TypeError:
+        # scipy 1.12より前
+        x, status = scipy.sparse.linalg.cg(A, b, tol=tol, maxiter=maxiter, callback=callback)
+    return x, iterations[0], status == 0
+
+
+# 1つの行列・1つの解法を計測する
+# 時間はどの解法も呼び出し全体(初期化・初期残差を含む)で測る
+def run(name, A, method, k=2, tol=1e-8, maxiter=None) -> dict:
+    N = A.shape[0]
+    b = np.random.default_rng(0).random(N)
+    counter = Counter(A)
+    if method == 'scipy_cg':
+        start_time = time.perf_counter()
+        x, iterations, isConverged = _scipy_cg(counter, b, tol, maxiter)
+        elapsed_time = time.perf_counter() - start_time
+    else:
+        module = importlib.import_module(f'.{ method }', __package__)
+        kwargs = {'k': k} if 'kskip' in method else {}
+        # 求解関数の標準出力は表示しない
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_time = time.perf_counter()
+            x, info = getattr(module, method)(counter, b, tol=tol, maxiter=maxiter, **kwargs)
+            elapsed_time = time.perf_counter() - start_time
+        iterations = int(info['nosl'][-1])
+        isConverged = bool(info['residual'][-1] < tol)
+    residual = float(np.linalg.norm(b - A.dot(x)) / np.linalg.norm(b))
+    # 行列ベクトル積で読み書きした量(行列 + 入出力ベクトル). 帯域は行列ベクトル積の時間だけで割る
+    traffic = counter.count * (footprint(A) + 2 * N * np.dtype(A.dtype).itemsize)
+    return {
+        'matrix': name,
+        'N': N,
+        'nnz': int(A.nnz),
+        'method': method,
+        'k': k if 'kskip' in method else None,
+        'time': elapsed_time,
+        'iterations': iterations,
+        'time_per_iteration': elapsed_time / max(1, iterations),
+        'matvecs': counter.count,
+        'matvec_time': counter.time,
+        'bandwidth': traffic / counter.time / 1e9 if counter.time > 0 else 0.0,
+        'residual': residual,
+        'converged': isConverged,
+    }
+
+
+def benchmark(sizes=(10000,), names=None, methods=METHODS, k=2, tol=1e-8, maxiter=None, directory=None) -> list:
+    """行列の一覧に対して各解法を計測する
+
+    Args:
+        sizes (tuple, optional): 生成する行列のおよその行数
+        names (list, optional): 使う生成器の名前. Noneなら全て
+        methods (tuple, optional): 計測する解法
+        k (int, optional): k-skip系のk
+        tol (float, optional): 収束判定の閾値
+        maxiter (int, optional): 最大反復回数
+        directory (str, optional): 手元の行列を置いたディレクトリ
+
+    Returns:
+        list: 計測結果(行列と解法の組ごとの辞書)
+    """
+    results = []
+    for name, A in zoo(sizes, names, directory):
+        for method in methods:
+            results.append(run(name, A, method, k, tol, maxiter))
+    return results
+
+
+# 表形式で表示する
+def table(results) -> str:
+    columns = ('matrix', 'method', 'N', 'iterations', 'time', 'time_per_iteration', 'bandwidth', 'residual')
+    header = ('matrix', 'method', 'N', 'iter', 'time[s]', 'time/iter[s]', 'SpMV GB/s', 'true residual')
+    rows = [header]
+    for result in results:
+        method = result['method'] if result['k'] is None else f'{ result["method"] }(k={ result["k"] })'
+        values = dict(result, method=method)
+        rows.append(tuple(
+            f'{ values[c]:.3e}' if isinstance(values[c], float) else str(values[c]) for c in columns
+        ))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+if __name__ == '__main__':
+    import argparse
+    from .zoo import GENERATORS
+
+    parser = argparse.ArgumentParser(description='benchmark v3 cpu solvers')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000])
+    parser.add_argument('--matrices', nargs='+', choices=list(GENERATORS), default=None)
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--k', type=int, default=2)
+    parser.add_argument('--tol', type=float, default=1e-8)
+    parser.add_argument('--maxiter', type=int, default=None)
+    parser.add_argument('--directory', default=None, help='directory of .mtx/.npz/.kmat files')
+    parser.add_argument('--json', default=None, help='write results to this file')
+    args = parser.parse_args()
+
+    results = benchmark(args.sizes, args.matrices, args.methods, args.k, args.tol, args.maxiter, args.directory)
+    print(table(results))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,104 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from .common import cores
+
+
+def _controller():
+    try:
+        from threadpoolctl import ThreadpoolController
+    except ImportError:
+        return None
+    return ThreadpoolController()
+
+
+# BLAS/OpenMPのスレッド数はプロセス全体で共有されるので, 制限は1つだけ置き,
+# 使用中のBlasThreadsの数で参照カウントする(最後のrestoreで元に戻す)
+_lock = threading.Lock()
+_limiter = None
+_users = 0
+
+
+class BlasThreads(object):
+    """BLAS/OpenMPのスレッド数の管理
+
+    threadpoolctlがあれば読み込み済みのBLAS/OpenMPのスレッド数を直接変更する.
+    無い場合は何もしない(BLASの読み込み後に環境変数を変えても効かないため).
+    同じプロセスで複数使う場合は最初にapplyしたスレッド数が有効になる.
+    widenの区間(行列ベクトル積・Gram行列の内積など)では一時的にwideまで増やす.
+
+    Args:
+        num_of_thread (int, optional): スレッド数. Noneなら使えるコア数
+            (mpirun・SLURMでコアに固定されていなければ, それをlocal_sizeで割った数)
+        local_size (int, optional): ノード内のプロセス数
+        wide (int, optional): widenの区間のスレッド数. Noneなら環境変数 KRYLOV_BLAS_WIDE (無ければ使えるコア数)
+    """
+
+    def __init__(self, num_of_thread=None, local_size=1, wide=None):
+        available = len(cores())
+        if num_of_thread is None:
+            # 固定されたコアはこのプロセス専用なので割らない
+            bound = available < os.cpu_count()
+            num_of_thread = available if bound else max(1, available // max(1, local_size))
+        self.num_of_thread = num_of_thread
+        self.local_size = local_size
+        if wide is None:
+            wide = int(os.environ.get('KRYLOV_BLAS_WIDE', available))
+        self.wide = wide
+        self.controller = _controller()
+        self.applied = False
+        self.widened = 0
+
+    # スレッド数を制限する
+    def apply(self):
+        global _limiter, _users
+        if self.applied or self.controller is None:
+            return self
+        with _lock:
+            if _users == 0:
+                _limiter = self.controller.limit(limits=self.num_of_thread)
+            _users += 1
+        self.applied = True
+        return self
+
+    # 元のスレッド数に戻す(他に使用中のものが無い場合)
+    def restore(self):
+        global _limiter, _users
+        if not self.applied:
+            return
+        self.applied = False
+        with _lock:
+            _users -= 1
+            if _users == 0:
+                _limiter.restore_original_limits()
+                _limiter = None
+
+    # 区間内だけスレッド数をwide(またはnum_of_thread)に増やす. 抜けると元の制限に戻る(入れ子にできる)
+    @contextmanager
+    def widen(self, num_of_thread=None):
+        num_of_thread = self.wide if num_of_thread is None else num_of_thread
+        if not self.applied or num_of_thread <= self.num_of_thread:
+            yield
+            return
+        with _lock:
+            limiter = self.controller.limit(limits=num_of_thread)
+        self.widened += 1
+        try:
+            yield
+        finally:
+            with _lock:
+                limiter.restore_original_limits()
+
+    # 実際に有効なスレッド数. 'wide' はwidenの区間のスレッド数('widened' はその回数)
+    def info(self) -> dict:
+        info = {'requested': self.num_of_thread, 'local_size': self.local_size}
+        info['wide'] = max(self.wide, self.num_of_thread) if self.applied else self.num_of_thread
+        info['widened'] = self.widened
+        if self.controller is None:
+            info['controlled'] = False
+            return info
+        info['controlled'] = True
+        for pool in self.controller.info():
+            info[pool['user_api']] = max(pool['num_threads'], info.get(pool['user_api'], 0))
+        return info
@@ -0,0 +1,136 @@
+import time
+
+import numpy as np
+import scipy.sparse
+
+from .common import compress
+from .kernels import jit, prange, payoff, report
+
+# 検出するブロックの大きさ(大きいものから試す)
+CANDIDATES = (8, 6, 5, 4, 3, 2)
+
+
+def _spmv(indptr, indices, data, x, y):
+    R = data.shape[1]
+    C = data.shape[2]
+    for I in prange(indptr.size - 1):
+        # ブロック行ごとに小さな密行列ベクトル積を足し合わせる
+        acc = np.zeros(R, y.dtype)
+        for p in range(indptr[I], indptr[I + 1]):
+            J = indices[p] * C
+            for r in range(R):
+                for c in range(C):
+                    acc[r] += data[p, r, c] * x[J + c]
+        for r in range(R):
+            y[I * R + r] = acc[r]
+
+
+def _spmm(indptr, indices, data, x, y):
+    R = data.shape[1]
+    C = data.shape[2]
+    m = x.shape[1]
+    for I in prange(indptr.size - 1):
+        acc = np.zeros((R, m), y.dtype)
+        for p in range(indptr[I], indptr[I + 1]):
+            J = indices[p] * C
+            for r in range(R):
+                for c in range(C):
+                    value = data[p, r, c]
+                    for t in range(m):
+                        acc[r, t] += value * x[J + c, t]
+        for r in range(R):
+            for t in range(m):
+                y[I * R + r, t] = acc[r, t]
+
+
+_spmv_compiled = jit(_spmv)
+_spmm_compiled = jit(_spmm)
+
+
+# 詰め物が max_fill 倍以下で済む最大のブロックの大きさ. 見つからなければ1
+# divisor を指定すると, その約数のみを候補にする(MPIの担当行数など)
+def block_size(A, candidates=CANDIDATES, max_fill=1.25, divisor=None) -> int:
+    A = scipy.sparse.coo_matrix(A)
+    n, N = A.shape
+    if A.nnz == 0:
+        return 1
+    row = A.row.astype(np.int64)
+    col = A.col.astype(np.int64)
+    for b in sorted(candidates, reverse=True):
+        if n % b or N % b or (divisor is not None and divisor % b):
+            continue
+        num_of_block = np.unique(row // b * (N // b) + col // b).size
+        if num_of_block * b * b <= max_fill * A.nnz:
+            return b
+    return 1
+
+
+class Bsr(object):
+    """ブロックCSR(BSR)形式の行列
+
+    多自由度のPDEから得られる, 小さな密ブロックからなる行列をブロック単位のCSRで持つ.
+    列番号はブロックごとに1つなので, CSRに比べて読む列番号がブロックの要素数分の1になる.
+    numbaがあればコンパイルしたカーネルで, 無ければscipyのBSRで計算する.
+    MPIでは partition でブロック行の境界に沿って分割した行ブロックをMultiCpuに渡す.
+
+    Args:
+        A (scipy.sparse matrix or numpy.ndarray): 係数行列, またはその行ブロック
+        blocksize (int, optional): ブロックの大きさ. Noneなら検出する
+        verbose (bool, optional): Trueなら変換時間とCSRに対する速度を計測して表示する
+    """
+
+    def __init__(self, A, blocksize=None, verbose=False):
+        start_time = time.perf_counter()
+        A = scipy.sparse.csr_matrix(A)
+        A.sum_duplicates()
+        if blocksize is None:
+            blocksize = block_size(A)
+        self.matrix = compress(scipy.sparse.bsr_matrix(A, blocksize=(blocksize, blocksize)))
+        self.matrix.sort_indices()
+        self.blocksize = blocksize
+        self.shape = A.shape
+        self.dtype = A.dtype
+        self.nnz = A.nnz
+        self.nbytes = self.matrix.data.nbytes + self.matrix.indices.nbytes + self.matrix.indptr.nbytes
+
+        self.cost = {'convert_time': time.perf_counter() - start_time, 'fill': self.matrix.data.size / max(1, self.nnz)}
+        if verbose:
+            self.cost.update(payoff(A, self, self.cost['convert_time']))
+            report(f'BSR { blocksize }x{ blocksize }', self.cost)
+
+    # 行列ベクトル積(xが2次元なら行列積)
+    def dot(self, x, out=None):
+        if _spmv_compiled is None:
+            y = self.matrix.dot(x)
+            if out is None:
+                return y
+            out[...] = y
+            return out
+        x = np.ascontiguousarray(x)
+        shape = (self.shape[0],) + x.shape[1:]
+        T = np.result_type(self.dtype, x.dtype)
+        y = out if out is not None and out.flags.c_contiguous and out.dtype == T else np.empty(shape, T)
+        matrix = self.matrix
+        (_spmv_compiled if x.ndim == 1 else _spmm_compiled)(matrix.indptr, matrix.indices, matrix.data, x, y)
+        if out is not None and y is not out:
+            out[...] = y
+            return out
+        return y
+
+    matvec = dot
+    matmat = dot
+
+
+# MPI: 自ランクの担当行をBSRで返す(ブロックの大きさは全体の行列で決め, 担当行数の約数にする)
+def partition(comm, A, blocksize=None, verbose=False):
+    size = comm.Get_size()
+    N = A.shape[0]
+    if N % size:
+        raise ValueError(f'N={ N } is not divisible by the number of processes { size }')
+    local_N = N // size
+    if blocksize is None:
+        blocksize = block_size(A, divisor=local_N)
+    elif local_N % blocksize:
+        raise ValueError(f'local_N={ local_N } is not a multiple of blocksize { blocksize }')
+    begin = comm.Get_rank() * local_N
+    return Bsr(compress(scipy.sparse.csr_matrix(A))[begin:begin+local_N], blocksize, verbose)
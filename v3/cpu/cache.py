@@ -0,0 +1,126 @@
+import json
+
+import numpy as np
+import scipy.sparse
+
+from .common import compress
+
+# 形式: 先頭にヘッダー(MAGIC + JSON), 続いて配列をALIGNバイト境界に並べる
+MAGIC = b'KRYLOVMAT\n'
+ALIGN = 4096
+VERSION = 1
+EXTENSION = '.kmat'
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+# 行列をキャッシュ形式で書き出す
+def save(A, path) -> None:
+    if isinstance(A, np.ndarray):
+        kind = 'dense'
+        arrays = {'data': np.ascontiguousarray(A)}
+    else:
+        kind = 'csr'
+        A = compress(scipy.sparse.csr_matrix(A))
+        A.sum_duplicates()
+        arrays = {'indptr': A.indptr, 'indices': A.indices, 'data': A.data}
+
+    # ヘッダーの大きさが決まるまで配列の位置を詰め直す
+    header_size = ALIGN
+    while True:
+        offset = header_size
+        sections = {}
+        for name, array in arrays.items():
+            sections[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset = _aligned(offset + array.nbytes)
+        header = json.dumps({
+            'version': VERSION,
+            'format': kind,
+            'shape': list(A.shape),
+            'nnz': int(A.size if kind == 'dense' else A.nnz),
+            'arrays': sections,
+        }).encode()
+        if len(MAGIC) + 8 + len(header) <= header_size:
+            break
+        header_size = _aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(sections[name]['offset'])
+            np.ascontiguousarray(array).tofile(f)
+        f.truncate(max(offset, header_size))
+
+
+# ヘッダーを読む
+def header(path) -> dict:
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{ path } is not a matrix cache file')
+        size = int.from_bytes(f.read(8), 'little')
+        return json.loads(f.read(size))
+
+
+# 配列をメモリマップで開く(コピーせず, 参照したページのみ読み込まれる)
+def open_arrays(path) -> dict:
+    meta = header(path)
+    arrays = {}
+    for name, section in meta['arrays'].items():
+        shape = tuple(section['shape'])
+        if np.prod(shape) == 0:
+            arrays[name] = np.zeros(shape, section['dtype'])
+            continue
+        arrays[name] = np.memmap(path, section['dtype'], 'r', section['offset'], shape)
+    arrays['shape'] = np.array(meta['shape'], np.int64)
+    return arrays
+
+
+# キャッシュ形式の行列を読み込む(疎行列はメモリマップ上のCSR, 密行列はメモリマップ)
+def load(path):
+    meta = header(path)
+    arrays = open_arrays(path)
+    if meta['format'] == 'dense':
+        return arrays['data']
+    # 添字の全走査を避けるため検査せずに組み立てる
+    A = scipy.sparse.csr_matrix(tuple(meta['shape']), dtype=arrays['data'].dtype)
+    A.data, A.indices, A.indptr = arrays['data'], arrays['indices'], arrays['indptr']
+    # 書き出し時に重複の統合・整列を済ませている
+    A.has_canonical_format = True
+    return A
+
+
+# 他の形式(.npz, Matrix Market, .npy)から読み込む
+def read(path):
+    if path.endswith(EXTENSION):
+        return load(path)
+    if path.endswith('.npz'):
+        return scipy.sparse.load_npz(path).tocsr()
+    if path.endswith('.npy'):
+        return np.load(path)
+    if path.endswith(('.mtx', '.mtx.gz', '.mm')):
+        from .mmio import mmread
+        return mmread(path)
+    raise ValueError(f'unknown matrix format: { path }')
+
+
+# 他の形式からキャッシュ形式へ変換する. destinationを省略すると拡張子を置き換える
+def convert(source, destination=None) -> str:
+    if destination is None:
+        destination = source
+        for extension in ('.npz', '.npy', '.mtx.gz', '.mtx', '.mm'):
+            if destination.endswith(extension):
+                destination = destination[:-len(extension)]
+                break
+        destination += EXTENSION
+    save(read(source), destination)
+    return destination
+
+
+if __name__ == '__main__':
+    import sys
+    for source in sys.argv[1:]:
+        print(source, '->', convert(source))
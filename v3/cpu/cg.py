@@ -1,16 +1,22 @@
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init
+from .common import start, finish, init, zeros, operator, matvec
+from .timer import Timer, summarize, BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
 def cg(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None) -> tuple:
     # 初期化
+    A = operator(A)
+    timer = Timer()
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
 
     # 初期残差
     r = b - A.dot(x)
-    p = r.copy()
+    # 行列ベクトル積の入出力は演算子の作業領域に置く
+    p = zeros(A, N, float64)
+    p[:] = r
+    v = zeros(A, N, float64)
     gamma = dot(r, r)
 
     # 反復計算
@@ -18,21 +24,30 @@ def cg(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None)
     start_time = start(method_name='CG')
     while i < maxiter:
         # 収束判定
+        t = timer.tic()
         residual[i] = norm(r) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         if residual[i] < tol:
             isConverged = True
             break
 
         # 解の更新
-        v = A.dot(p)
+        matvec(A, p, v)
+        t = timer.toc(BASIS, t)
         sigma = dot(p, v)
+        t = timer.toc(COEFFICIENTS, t)
         alpha = gamma / sigma
+        t = timer.toc(RECURRENCE, t)
         x += alpha * p
         r -= alpha * v
+        t = timer.toc(UPDATE, t)
         old_gamma = gamma.copy()
         gamma = dot(r, r)
+        t = timer.toc(COEFFICIENTS, t)
         beta = gamma / old_gamma
-        p = r + beta * p
+        t = timer.toc(RECURRENCE, t)
+        p[:] = r + beta * p
+        timer.toc(UPDATE, t)
         i += 1
         num_of_solution_updates[i] = i
     else:
@@ -45,4 +60,5 @@ def cg(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None)
         'nosl': num_of_solution_updates[:i+1],
         'residual': residual[:i+1],
     }
+    summarize(info, A, timer, 'cg')
     return x, info
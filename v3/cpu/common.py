@@ -1,20 +1,29 @@
+import os
 import time
 
 import numpy as np
+import scipy.sparse
 
 from ..common import _start, _finish
+from . import dia, matrixfree, trace
 
 
 # 計測開始
 def start(method_name: str = '', k: int = None) -> float:
     _start(method_name, k)
+    if trace.tracer is not None:
+        trace.tracer.name = method_name if k is None else f'{ method_name } (k={ k })'
     return time.perf_counter()
 
 
 # 計測終了
 def finish(start_time: float, isConverged: bool, num_of_iter: int, final_residual: float, final_k: int = None) -> float:
-    elapsed_time = time.perf_counter() - start_time
+    end_time = time.perf_counter()
+    elapsed_time = end_time - start_time
     _finish(elapsed_time, isConverged, num_of_iter, final_residual, final_k)
+    if trace.tracer is not None:
+        trace.tracer.span(trace.tracer.name, 'solve', start_time, end_time)
+        trace.tracer.write()
     return elapsed_time
 
 
@@ -34,3 +43,111 @@ def init(b, x=None, maxiter=None) -> tuple:
     num_of_solution_updates = np.zeros(maxiter+1, np.int)
 
     return x, maxiter, b_norm, N, residual, num_of_solution_updates
+
+
+# ベクトル領域の確保
+# 演算子が作業領域を持つ場合(共有メモリなど)はそこから確保する
+def zeros(A, shape, T):
+    if hasattr(A, 'zeros'):
+        return A.zeros(shape, T)
+    return np.zeros(shape, T)
+
+
+# 疎行列の添字(indices, indptr)をint32にする(行数・列数・非零要素数が収まる場合)
+# 値の配列はコピーしない. 以降の行ブロックの切り出し・転置などもint32のまま行われる
+def compress(A):
+    if not scipy.sparse.issparse(A) or A.format not in ('csr', 'csc', 'bsr'):
+        return A
+    if A.indices.dtype == np.int32 and A.indptr.dtype == np.int32:
+        return A
+    if max(A.shape + (A.nnz,)) > np.iinfo(np.int32).max:
+        return A
+    kwargs = {'blocksize': A.blocksize} if A.format == 'bsr' else {}
+    return type(A)((A.data, A.indices.astype(np.int32), A.indptr.astype(np.int32)), shape=A.shape, copy=False, **kwargs)
+
+
+# 行列(演算子)が占めるメモリ量
+def footprint(A) -> int:
+    if scipy.sparse.issparse(A):
+        A = A.tocsr()
+        return A.data.nbytes + A.indices.nbytes + A.indptr.nbytes
+    if isinstance(A, np.ndarray):
+        return A.nbytes
+    if hasattr(A, 'A'):
+        # MultiCpu
+        return footprint(A.A)
+    return getattr(A, 'nbytes', 0)
+
+
+# 演算子の準備: 疎行列の添字を圧縮し, dotを持たない演算子はMatrixFreeで包む
+# KRYLOV_DIA=1 なら対角格納に向いた疎行列をDiaに変換する(beginは行ブロックの先頭行)
+def operator(A, begin=0):
+    if os.environ.get('KRYLOV_DIA', '0') == '1':
+        A = dia.convert(A, begin)
+    return matrixfree.operator(compress(A))
+
+
+# 行列ベクトル積をoutへ書き込む
+# 独自の演算子(共有メモリ・スレッドなど)にはoutを渡し, 作業領域へ直接書き込ませる(コピーしない)
+def matvec(A, x, out):
+    if scipy.sparse.issparse(A) or isinstance(A, np.ndarray):
+        out[...] = A.dot(x)
+        return out
+    return A.dot(x, out=out)
+
+
+# 基底計算: 系列Vごとに V[j] = A V[j-1] (j = 1, ..., count) を計算する
+# 演算子がbatched(out-of-coreなど)なら, 各系列の同じ段をまとめて1回の行列積にする
+def basis(A, *chains) -> None:
+    if not getattr(A, 'batched', False):
+        for V, count in chains:
+            for j in range(1, count + 1):
+                matvec(A, V[j-1], V[j])
+        return
+    for j in range(1, max(count for _, count in chains) + 1):
+        active = [V for V, count in chains if j <= count]
+        Y = A.dot(np.stack([V[j-1] for V in active], axis=1))
+        for t, V in enumerate(active):
+            V[j] = Y[:, t]
+
+
+# 行ブロック[begin, end)を取り出す(CSRの値・列番号はコピーしない)
+def rows(A, begin, end):
+    if isinstance(A, np.ndarray):
+        return A[begin:end]
+    first, last = A.indptr[begin], A.indptr[end]
+    return scipy.sparse.csr_matrix(
+        (A.data[first:last], A.indices[first:last], A.indptr[begin:end+1] - first),
+        shape=(end - begin, A.shape[1])
+    )
+
+
+# 非零要素数がほぼ均等になるよう行を分割し, 各ブロックの先頭行(と末尾)を返す
+def balance(A, num_of_block):
+    N = A.shape[0]
+    if isinstance(A, np.ndarray):
+        weight = np.arange(N + 1) * A.shape[1]
+    else:
+        weight = A.indptr
+    targets = np.linspace(0, weight[-1], num_of_block + 1)
+    offsets = np.searchsorted(weight, targets).clip(0, N)
+    offsets[0], offsets[-1] = 0, N
+    return offsets
+
+
+# 利用できるコアの一覧
+def cores() -> list:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+# 呼び出し元のスレッド(プロセス)をコアに固定する
+def pin(core) -> None:
+    if core is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {core})
+
+
+# ファーストタッチ: 担当する行[begin, end)を書き込み, 呼び出し元のNUMAノードにページを置く
+def touch(vector, N, begin, end) -> None:
+    vector.reshape(-1, N)[:, begin:end] = 0
@@ -0,0 +1,148 @@
+import time
+
+import numpy as np
+import scipy.sparse
+
+from .kernels import jit, prange, payoff, report
+
+# 1タイルの行数(タイル内でx, yがキャッシュに残る大きさ)
+TILE = 4096
+
+
+def _spmv(shifts, data, x, y):
+    n = y.shape[0]
+    N = x.shape[0]
+    for b in prange((n + TILE - 1) // TILE):
+        begin = b * TILE
+        end = min(n, begin + TILE)
+        for i in range(begin, end):
+            y[i] = 0
+        for d in range(shifts.size):
+            shift = shifts[d]
+            for i in range(max(begin, -shift), min(end, N - shift)):
+                y[i] += data[d, i] * x[i + shift]
+
+
+def _spmm(shifts, data, x, y):
+    n = y.shape[0]
+    N = x.shape[0]
+    m = x.shape[1]
+    for b in prange((n + TILE - 1) // TILE):
+        begin = b * TILE
+        end = min(n, begin + TILE)
+        for i in range(begin, end):
+            for t in range(m):
+                y[i, t] = 0
+        for d in range(shifts.size):
+            shift = shifts[d]
+            for i in range(max(begin, -shift), min(end, N - shift)):
+                value = data[d, i]
+                for t in range(m):
+                    y[i, t] += value * x[i + shift, t]
+
+
+_spmv_compiled = jit(_spmv)
+_spmm_compiled = jit(_spmm)
+
+
+# 非零要素が少数の対角線上にあればその位置(列番号 - 全体の行番号)を返す. 無ければNone
+def detect(A, begin=0, max_diagonals=32, max_fill=1.5):
+    A = scipy.sparse.coo_matrix(A)
+    n, N = A.shape
+    if A.nnz == 0:
+        return None
+    counts = np.bincount(A.col.astype(np.int64) - A.row + n, minlength=n + N)
+    offsets = np.flatnonzero(counts) - n - begin
+    # 詰め物(対角線上の零)が多すぎる場合はCSRのままにする
+    if offsets.size > max_diagonals or offsets.size * n > max_fill * A.nnz:
+        return None
+    return offsets
+
+
+class Dia(object):
+    """対角格納(DIA)形式の行列
+
+    ステンシル行列のように非零要素が少数の対角線上にある行列を, 対角線ごとの値の配列で持つ.
+    列番号を持たないのでCSRに比べて行列ベクトル積で読むバイト数が減る.
+    Aが行ブロック A[begin:begin+n] の場合は全体での対角線の位置を使う(MultiCpuにそのまま渡せる).
+    numbaがあればコンパイルしたカーネルで, 無ければnumpyで計算する.
+
+    Args:
+        A (scipy.sparse matrix or numpy.ndarray): 係数行列, またはその行ブロック
+        begin (int, optional): 行ブロックの先頭行
+        offsets (numpy.ndarray, optional): 対角線の位置. Noneなら検出する
+        verbose (bool, optional): Trueなら変換時間とCSRに対する速度を計測して表示する
+    """
+
+    def __init__(self, A, begin=0, offsets=None, verbose=False):
+        start_time = time.perf_counter()
+        A = scipy.sparse.coo_matrix(A)
+        A.sum_duplicates()
+        n, N = A.shape
+        if offsets is None:
+            offsets = detect(A, begin, max_diagonals=n + N, max_fill=np.inf)
+            if offsets is None:
+                offsets = np.zeros(0, np.int64)
+        self.shape = A.shape
+        self.dtype = A.dtype
+        self.begin = begin
+        self.offsets = np.asarray(offsets, np.int64)
+        # 行ブロック内の行番号から列番号へのずれ
+        self.shifts = self.offsets + begin
+
+        # data[d, i] = A[i, begin + i + offsets[d]]
+        diagonal = A.col.astype(np.int64) - A.row - begin
+        index = np.searchsorted(self.offsets, diagonal).clip(0, max(0, self.offsets.size - 1))
+        if A.nnz and not np.array_equal(self.offsets[index], diagonal):
+            raise ValueError('A has nonzeros outside the given diagonals')
+        self.data = np.zeros((self.offsets.size, n), self.dtype)
+        self.data[index, A.row] = A.data
+        self.nnz = A.nnz
+        self.nbytes = self.data.nbytes + self.offsets.nbytes
+
+        self.cost = {'convert_time': time.perf_counter() - start_time, 'fill': self.data.size / max(1, self.nnz)}
+        if verbose:
+            self.cost.update(payoff(A, self, self.cost['convert_time']))
+            report(f'DIA ({ self.offsets.size } diagonals)', self.cost)
+
+    # 行列ベクトル積(xが2次元なら行列積)
+    def dot(self, x, out=None):
+        x = np.ascontiguousarray(x)
+        shape = (self.shape[0],) + x.shape[1:]
+        T = np.result_type(self.dtype, x.dtype)
+        y = out if out is not None and out.flags.c_contiguous and out.dtype == T else np.empty(shape, T)
+        if _spmv_compiled is not None:
+            (_spmv_compiled if x.ndim == 1 else _spmm_compiled)(self.shifts, self.data, x, y)
+        else:
+            self._dot_numpy(x, y)
+        if out is not None and y is not out:
+            out[...] = y
+            return out
+        return y
+
+    matvec = dot
+    matmat = dot
+
+    # 対角線ごとに連続した区間をまとめて計算する
+    def _dot_numpy(self, x, y):
+        n = self.shape[0]
+        N = x.shape[0]
+        y[...] = 0
+        for d, shift in enumerate(self.shifts):
+            lo, hi = max(0, -shift), min(n, N - shift)
+            if lo >= hi:
+                continue
+            values = self.data[d, lo:hi]
+            if x.ndim == 2:
+                values = values[:, None]
+            y[lo:hi] += values * x[lo+shift:hi+shift]
+
+
+# 対角格納に向いた行列ならDiaに変換し, そうでなければそのまま返す
+def convert(A, begin=0, max_diagonals=32, max_fill=1.5, verbose=False):
+    if isinstance(A, np.ndarray) or not scipy.sparse.issparse(A):
+        return A
+    offsets = detect(A, begin, max_diagonals, max_fill)
+    if offsets is None:
+        return A
+    return Dia(A, begin, offsets, verbose)
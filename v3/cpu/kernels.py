@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+import scipy.sparse
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# numbaが無い場合は range (カーネルはnumpyでの実装に切り替わる)
+prange = numba.prange if numba is not None else range
+
+
+# numbaがあればカーネルをコンパイルする. 無ければNoneを返し, 呼び出し側はnumpyでの実装を使う
+def jit(function):
+    if numba is None:
+        return None
+    return numba.njit(parallel=True, fastmath=True, cache=True)(function)
+
+
+# 1回の行列ベクトル積の時間(repeat回の最小値)
+def _elapsed(dot, x, repeat) -> float:
+    dot(x)
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        dot(x)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+# 形式変換の費用対効果: CSRと比べて何回の行列ベクトル積で変換時間を取り戻せるか
+def payoff(A, operator, convert_time: float, repeat: int = 10) -> dict:
+    A = scipy.sparse.csr_matrix(A)
+    x = np.random.default_rng(0).random(A.shape[1])
+    csr_time = _elapsed(A.dot, x, repeat)
+    operator_time = _elapsed(operator.dot, x, repeat)
+    gain = csr_time - operator_time
+    return {
+        'convert_time': convert_time,
+        'csr_time': csr_time,
+        'time': operator_time,
+        'speedup': csr_time / operator_time if operator_time > 0 else float('inf'),
+        # 元が取れる反復回数(速くならない場合はinf)
+        'break_even': int(np.ceil(convert_time / gain)) if gain > 0 else float('inf'),
+        'compiled': numba is not None,
+    }
+
+
+# 形式変換の費用対効果の表示
+def report(format_name: str, cost: dict) -> None:
+    print('# ', '='*16, ' FORMAT ', '='*14, ' #', sep='')
+    print(f'Format:\t\t{ format_name }')
+    print(f'Convert:\t{ cost["convert_time"] } s')
+    if 'time' in cost:
+        print(f'SpMV:\t\t{ cost["time"] } s (CSR { cost["csr_time"] } s)')
+        print(f'Speedup:\t{ cost["speedup"] }')
+        print(f'Break_even:\t{ cost["break_even"] } matvecs')
+    print('# ', '='*38, ' #', sep='')
@@ -2,23 +2,26 @@ import numpy as np
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init
+from .common import start, finish, init, zeros, operator, basis, matvec
+from .timer import Timer, summarize, BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
 def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
     # 初期化
+    A = operator(A)
+    timer = Timer()
     T = float64
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
 
     # 初期化
-    Ar = np.zeros((k + 2, N), T)
-    Ap = np.zeros((k + 3, N), T)
+    Ar = zeros(A, (k + 2, N), T)
+    Ap = zeros(A, (k + 3, N), T)
     a = np.zeros(2 * k + 2, T)
     f = np.zeros(2 * k + 4, T)
     c = np.zeros(2 * k + 2, T)
 
     # 初期残差
-    Ar[0] = b - dot(A, x)
+    Ar[0] = b - A.dot(x)
     Ap[0] = Ar[0]
 
     # 反復計算
@@ -27,16 +30,16 @@ def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, a
     start_time = start(method_name='k-skip CG', k=k)
     while i < maxiter:
         # 収束判定
+        t = timer.tic()
         residual[index] = norm(Ar[0]) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         if residual[index] < tol:
             isConverged = True
             break
 
         # 事前計算
-        for j in range(1, k + 1):
-            Ar[j] = dot(A, Ar[j-1])
-        for j in range(1, k + 2):
-            Ap[j] = dot(A, Ap[j-1])
+        basis(A, (Ar, k), (Ap, k + 1))
+        t = timer.toc(BASIS, t)
         for j in range(2 * k + 1):
             jj = j // 2
             a[j] = dot(Ar[jj], Ar[jj + j % 2])
@@ -46,14 +49,18 @@ def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, a
         for j in range(2 * k + 2):
             jj = j // 2
             c[j] = dot(Ar[jj], Ap[jj + j % 2])
+        t = timer.toc(COEFFICIENTS, t)
 
         # CGでの1反復
         alpha = a[0] / f[1]
         beta = alpha ** 2 * f[2] / a[0] - 1
+        t = timer.toc(RECURRENCE, t)
         x += alpha * Ap[0]
         Ar[0] -= alpha * Ap[1]
         Ap[0] = Ar[0] + beta * Ap[0]
-        Ap[1] = dot(A, Ap[0])
+        t = timer.toc(UPDATE, t)
+        matvec(A, Ap[0], Ap[1])
+        t = timer.toc(BASIS, t)
 
         # CGでのk反復
         for j in range(0, k):
@@ -66,10 +73,13 @@ def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, a
             # 解の更新
             alpha = a[0] / f[1]
             beta = alpha ** 2 * f[2] / a[0] - 1
+            t = timer.toc(RECURRENCE, t)
             x += alpha * Ap[0]
             Ar[0] -= alpha * Ap[1]
             Ap[0] = Ar[0] + beta * Ap[0]
-            Ap[1] = dot(A, Ap[0])
+            t = timer.toc(UPDATE, t)
+            matvec(A, Ap[0], Ap[1])
+            t = timer.toc(BASIS, t)
 
         i += (k + 1)
         index += 1
@@ -84,4 +94,5 @@ def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, a
         'nosl': num_of_solution_updates[:index+1],
         'residual': residual[:index+1],
     }
+    summarize(info, A, timer, 'kskipcg', k)
     return x, info
@@ -2,7 +2,8 @@ import numpy as np
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init
+from .common import start, finish, init, zeros, operator, basis, matvec
+from .timer import Timer, summarize, BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
 def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
@@ -10,8 +11,10 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
 
     # 初期化
-    Ar = np.zeros((k + 2, N), T)
-    Ay = np.zeros((k + 1, N), T)
+    A = operator(A)
+    timer = Timer()
+    Ar = zeros(A, (k + 2, N), T)
+    Ay = zeros(A, (k + 1, N), T)
     alpha = np.zeros(2 * k + 3, T)
     beta = np.zeros(2 * k + 2, T)
     delta = np.zeros(2 * k + 1, T)
@@ -23,7 +26,7 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
 
     # 初期反復
     start_time = start(method_name='k-skip MrR', k=k)
-    Ar[1] = A.dot(Ar[0])
+    matvec(A, Ar[0], Ar[1])
     zeta = dot(Ar[0], Ar[1]) / dot(Ar[1], Ar[1])
     Ay[0] = zeta * Ar[1]
     z = -zeta * Ar[0]
@@ -36,16 +39,16 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
     # 反復計算
     while i < maxiter:
         # 収束判定
+        t = timer.tic()
         residual[index] = norm(Ar[0]) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         if residual[index] < tol:
             isConverged = True
             break
 
         # 基底計算
-        for j in range(1, k + 2):
-            Ar[j] = A.dot(Ar[j-1])
-        for j in range(1, k + 1):
-            Ay[j] = A.dot(Ay[j-1])
+        basis(A, (Ar, k + 1), (Ay, k))
+        t = timer.toc(BASIS, t)
 
         # 係数計算
         for j in range(2 * k + 3):
@@ -57,16 +60,21 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
         for j in range(2 * k + 1):
             jj = j // 2
             delta[j] = dot(Ay[jj], Ay[jj + j % 2])
+        t = timer.toc(COEFFICIENTS, t)
 
         # MrRでの1反復(解の更新)
         d = alpha[2] * delta[0] - beta[1] ** 2
         zeta = alpha[1] * delta[0] / d
         eta = -alpha[1] * beta[1] / d
+        t = timer.toc(RECURRENCE, t)
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
         Ar[0] -= Ay[0]
-        Ar[1] = A.dot(Ar[0])
+        t = timer.toc(UPDATE, t)
+        matvec(A, Ar[0], Ar[1])
+        t = timer.toc(BASIS, t)
         x -= z
+        t = timer.toc(UPDATE, t)
 
         # MrRでのk反復
         for j in range(k):
@@ -86,11 +94,15 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
             d = alpha[2] * delta[0] - beta[1] ** 2
             zeta = alpha[1] * delta[0] / d
             eta = -alpha[1] * beta[1] / d
+            t = timer.toc(RECURRENCE, t)
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
             Ar[0] -= Ay[0]
-            Ar[1] = A.dot(Ar[0])
+            t = timer.toc(UPDATE, t)
+            matvec(A, Ar[0], Ar[1])
+            t = timer.toc(BASIS, t)
             x -= z
+            t = timer.toc(UPDATE, t)
 
         i += (k + 1)
         index += 1
@@ -105,4 +117,5 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
         'nosl': num_of_solution_updates[:index+1],
         'residual': residual[:index+1],
     }
+    summarize(info, A, timer, 'kskipmrr', k)
     return x, info
@@ -0,0 +1,141 @@
+import numpy as np
+from scipy.sparse.linalg import LinearOperator
+
+
+class MatrixFree(object):
+    """matvec/matmatのみを持つ演算子(scipy.sparse.linalg.LinearOperatorなど)をdotで呼べるようにする
+
+    Args:
+        A: matvec(x)を持つ演算子. matmat(X)があれば行列積に使う
+    """
+
+    def __init__(self, A):
+        self.A = A
+        self.shape = A.shape
+        self.dtype = np.dtype(getattr(A, 'dtype', None) or np.float64)
+        self.nnz = getattr(A, 'nnz', 0)
+
+    # 行列ベクトル積(xが2次元なら行列積)
+    def dot(self, x, out=None):
+        if x.ndim == 1:
+            y = self.A.matvec(x)
+        elif hasattr(self.A, 'matmat'):
+            y = self.A.matmat(x)
+        else:
+            y = np.stack([self.A.matvec(x[:, t]) for t in range(x.shape[1])], axis=1)
+        y = np.asarray(y).reshape((self.shape[0],) + x.shape[1:])
+        if out is None:
+            return y
+        out[...] = y
+        return out
+
+    matvec = dot
+    matmat = dot
+
+
+# dotを持たない演算子(とLinearOperator)をMatrixFreeで包む
+def operator(A):
+    if hasattr(A, 'dot') and not isinstance(A, LinearOperator):
+        return A
+    if hasattr(A, 'matvec'):
+        return MatrixFree(A)
+    raise TypeError(f'A must have dot or matvec, not { type(A).__name__ }')
+
+
+class Poisson(object):
+    """2次元/3次元のPoisson方程式(5点/7点ステンシル, Dirichlet境界)の行列を持たない演算子
+
+    格子を shape のC順に並べたベクトルに対して, 中心 2 * ndim, 隣接点 -1 の積をスライスで計算する.
+    行列は scipy.sparse.kronsum で組み立てたものと一致する.
+    MPIでは行ブロック [begin, end) の行だけを計算する(先頭の軸の面の境界で分割する).
+
+    Args:
+        shape (tuple): 格子の大きさ (nx, ny) または (nx, ny, nz)
+        begin (int, optional): 行ブロックの先頭行
+        end (int, optional): 行ブロックの末尾行. Noneなら最後まで
+        T (optional): 精度
+    """
+
+    def __init__(self, shape, begin=0, end=None, T=np.float64):
+        self.grid = tuple(shape)
+        N = int(np.prod(self.grid))
+        plane = N // self.grid[0]
+        if end is None:
+            end = N
+        if begin % plane or end % plane:
+            raise ValueError(f'rows [{ begin }, { end }) must be aligned to planes of { plane } rows')
+        self.first, self.last = begin // plane, end // plane
+        self.shape = (end - begin, N)
+        self.dtype = np.dtype(T)
+        # 非零要素数(境界で減る隣接点を除く)
+        self.nnz = self.shape[0] * (2 * len(self.grid) + 1) - 2 * sum(self.shape[0] // n for n in self.grid[1:]) \
+            - (self.first == 0) * plane - (self.last == self.grid[0]) * plane
+
+    # 行列ベクトル積(xが2次元なら行列積)
+    def dot(self, x, out=None):
+        rest = x.shape[1:]
+        u = x.reshape(self.grid + rest)
+        first, last = self.first, self.last
+        y = (2 * len(self.grid)) * u[first:last]
+        # 先頭の軸: 担当外の隣接面も参照する
+        y[1:] -= u[first:last-1]
+        if first > 0:
+            y[0] -= u[first-1]
+        y[:-1] -= u[first+1:last]
+        if last < self.grid[0]:
+            y[-1] -= u[last]
+        # 残りの軸
+        for axis in range(1, len(self.grid)):
+            head = (slice(None),) * axis + (slice(1, None),)
+            tail = (slice(None),) * axis + (slice(None, -1),)
+            y[head] -= u[first:last][tail]
+            y[tail] -= u[first:last][head]
+        y = y.reshape(self.shape[:1] + rest)
+        if out is None:
+            return y
+        out[...] = y
+        return out
+
+    matvec = dot
+    matmat = dot
+
+
+class KronSum(object):
+    """クロネッカー和 kron(I_n, A) + kron(B, I_m) の行列を持たない演算子
+
+    scipy.sparse.kronsum(A, B) と同じ並び. ベクトルを (n, m) の行列Xとみなし,
+    X A^T + B X を計算する. A, B には行列やKronSum, Poissonなどdotを持つ演算子を渡せる.
+
+    Args:
+        A: m x m の演算子
+        B: n x n の演算子
+    """
+
+    def __init__(self, A, B):
+        self.A = operator(A)
+        self.B = operator(B)
+        m, n = self.A.shape[0], self.B.shape[0]
+        self.shape = (n * m, n * m)
+        self.dtype = np.result_type(self.A.dtype, self.B.dtype)
+        # 2つの項の非零要素数の和(対角が重なる分を含む上限)
+        self.nnz = n * getattr(self.A, 'nnz', 0) + m * getattr(self.B, 'nnz', 0)
+
+    # 行列ベクトル積(xが2次元なら行列積)
+    def dot(self, x, out=None):
+        m, n = self.A.shape[0], self.B.shape[0]
+        rest = x.shape[1:]
+        k = int(np.prod(rest, dtype=np.int64))
+        X = x.reshape(n, m, k)
+        # kron(B, I_m): Bを先頭の軸に掛ける
+        y = np.asarray(self.B.dot(X.reshape(n, m * k))).reshape(n, m, k)
+        # kron(I_n, A): Aを2番目の軸に掛ける
+        XT = X.transpose(1, 0, 2).reshape(m, n * k)
+        y += np.asarray(self.A.dot(XT)).reshape(m, n, k).transpose(1, 0, 2)
+        y = y.reshape((n * m,) + rest)
+        if out is None:
+            return y
+        out[...] = y
+        return out
+
+    matvec = dot
+    matmat = dot
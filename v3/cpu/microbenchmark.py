@@ -0,0 +1,114 @@
+import contextlib
+import io
+import json
+import os
+
+import numpy as np
+
+from . import roofline
+from .kskipcg import kskipcg
+from .kskipmrr import kskipmrr
+from .zoo import poisson2d
+
+SOLVERS = {'kskipcg': kskipcg, 'kskipmrr': kskipmrr}
+# 計測するフェーズ(Timerのフェーズ. communicationはMPIのみ)
+PHASES = ('basis', 'coefficients', 'recurrence', 'update', 'convergence')
+
+
+# フェーズ計測(KRYLOV_TIMINGS=1)を有効にした区間
+@contextlib.contextmanager
+def _timings():
+    previous = os.environ.get('KRYLOV_TIMINGS')
+    os.environ['KRYLOV_TIMINGS'] = '1'
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop('KRYLOV_TIMINGS')
+        else:
+            os.environ['KRYLOV_TIMINGS'] = previous
+
+
+# 求解関数をちょうどiterations回の外部反復だけ実行し, フェーズごとの積算時間を返す
+def _run(method, A, k, iterations) -> dict:
+    b = np.random.default_rng(0).random(A.shape[0])
+    # tol=0 で収束させず, maxiterで止める(k-skip MrRは初期反復で1回更新済み)
+    maxiter = iterations * (k + 1) + (method == 'kskipmrr')
+    with _timings(), np.errstate(all='ignore'), contextlib.redirect_stdout(io.StringIO()):
+        _, info = SOLVERS[method](A, b, tol=0, maxiter=maxiter, k=k)
+    return info['timings']
+
+
+def microbenchmark(sizes=(10000, 100000, 1000000), ks=(0, 1, 2, 4, 8), methods=('kskipcg', 'kskipmrr'), repeat=10) -> dict:
+    """k-skip系の1外部反復をフェーズ(基底計算, 係数計算, スカラー漸化式, ベクトル更新, 収束判定)ごとに計測する
+
+    行列は2次元Poisson. 求解関数そのものをrepeat回の外部反復だけ実行し, Timerのフェーズ時間を反復数で割る.
+    帯域幅は各フェーズが読み書きするバイト数(roofline.count)を時間で割ったもの.
+
+    Args:
+        sizes (tuple, optional): 行数
+        ks (tuple, optional): k
+        methods (tuple, optional): 'kskipcg', 'kskipmrr'
+        repeat (int, optional): 外部反復の回数(平均を使う)
+
+    Returns:
+        dict: {'stream': 要素数ごとの参照値, 'results': 計測結果の一覧}
+    """
+    references = {}
+    results = []
+    for size in sizes:
+        A = poisson2d(size)
+        N = A.shape[0]
+        references[N] = roofline.stream(N)
+        best = max(references[N].values())
+        for method in methods:
+            for k in ks:
+                timings = _run(method, A, k, repeat)
+                counts = roofline.count(method, A, 1, k=k)
+                for phase in PHASES:
+                    elapsed_time = timings[phase] / repeat
+                    nbytes = counts.get(phase, {'bytes': 0})['bytes']
+                    bandwidth = nbytes / elapsed_time / 1e9 if elapsed_time > 0 else 0.0
+                    results.append({
+                        'method': method,
+                        'N': N,
+                        'k': k,
+                        'phase': phase,
+                        'time': elapsed_time,
+                        'ns_per_element': elapsed_time / N * 1e9,
+                        'bandwidth': bandwidth if nbytes else None,
+                        'stream_ratio': bandwidth / best if nbytes else None,
+                    })
+    return {'stream': references, 'results': results}
+
+
+# 表形式で表示する
+def table(report) -> str:
+    lines = ['N\tcopy\tscale\tadd\ttriad [GB/s]']
+    for N, reference in report['stream'].items():
+        lines.append(f'{ N }\t' + '\t'.join(f'{ reference[name]:.2f}' for name in ('copy', 'scale', 'add', 'triad')))
+    lines.append('')
+    lines.append('method\tN\tk\tphase\t\ttime[s]\t\tns/elem\tGB/s\t%stream')
+    for r in report['results']:
+        bandwidth = '-' if r['bandwidth'] is None else f'{ r["bandwidth"]:.2f}'
+        ratio = '-' if r['stream_ratio'] is None else f'{ 100 * r["stream_ratio"]:.0f}'
+        lines.append(f'{ r["method"] }\t{ r["N"] }\t{ r["k"] }\t{ r["phase"]:<12}\t{ r["time"]:.3e}\t{ r["ns_per_element"]:.2f}\t{ bandwidth }\t{ ratio }')
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='phase microbenchmarks of the k-skip solvers')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--ks', type=int, nargs='+', default=[0, 1, 2, 4, 8])
+    parser.add_argument('--methods', nargs='+', choices=['kskipcg', 'kskipmrr'], default=['kskipcg', 'kskipmrr'])
+    parser.add_argument('--repeat', type=int, default=10, help='outer iterations per run')
+    parser.add_argument('--json', default=None, help='write results to this file')
+    args = parser.parse_args()
+
+    report = microbenchmark(args.sizes, args.ks, args.methods, args.repeat)
+    print(table(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,195 @@
+import gzip
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy
+import scipy.io
+import scipy.sparse
+from numpy.lib import NumpyVersion
+
+from .common import compress
+
+# scipy 1.12以降のscipy.io.mmreadはC++実装(全コアのスレッド, threadpoolctlで制限できる)で数値へ変換する
+FAST_MMREAD = NumpyVersion(scipy.__version__) >= '1.12.0'
+
+# 1プロセスが読むバイト数の目安
+CHUNK_BYTES = 64 << 20
+# 1行あたりの列数
+COLUMNS = {'pattern': 2, 'integer': 3, 'real': 3, 'complex': 4}
+
+
+def _open(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+# ヘッダーを読み, 形式・値の種類・対称性・大きさ・非零要素数・本体の先頭バイトを返す
+def header(path) -> dict:
+    with _open(path) as f:
+        banner = f.readline().decode().split()
+        if len(banner) != 5 or banner[0].lower() != '%%matrixmarket':
+            raise ValueError(f'{ path } is not a Matrix Market file')
+        _, _, layout, field, symmetry = (word.lower() for word in banner)
+        line = f.readline()
+        while line.startswith(b'%') or not line.strip():
+            line = f.readline()
+        shape = [int(word) for word in line.split()]
+        return {
+            'layout': layout, 'field': field, 'symmetry': symmetry,
+            'shape': tuple(shape[:2]), 'nnz': shape[2] if layout == 'coordinate' else shape[0] * shape[1],
+            'offset': f.tell(),
+        }
+
+
+# バイト範囲[begin, end)を行の境界に合わせる(範囲の先頭で始まる行を受け持つ)
+def _ranges(path, offset, num_of_chunk):
+    size = os.path.getsize(path)
+    bounds = np.linspace(offset, size, num_of_chunk + 1).astype(np.int64)
+    with open(path, 'rb') as f:
+        for i in range(1, num_of_chunk):
+            f.seek(bounds[i] - 1)
+            f.readline()
+            bounds[i] = max(f.tell(), bounds[i-1])
+    return [(bounds[i], bounds[i+1]) for i in range(num_of_chunk) if bounds[i] < bounds[i+1]]
+
+
+# 本体の一部を(行, 列, 値)へ変換する
+def _parse(text, meta):
+    field = meta['field']
+    # 途中のコメント行・空行は取り除く
+    if b'%' in text or b'\n\n' in text:
+        text = b'\n'.join(line for line in text.split(b'\n') if line.strip() and not line.lstrip().startswith(b'%'))
+    if not text.strip():
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+    if FAST_MMREAD:
+        # 範囲だけのMatrix Marketとして読む(対称性の展開は後で行う)
+        count = text.count(b'\n') + (not text.endswith(b'\n'))
+        banner = b'%%%%MatrixMarket matrix coordinate %s general\n%d %d %d\n' % (field.encode(), *meta['shape'], count)
+        A = scipy.io.mmread(io.BytesIO(banner + text))
+        return A.row.astype(np.int64), A.col.astype(np.int64), A.data
+    # 空白区切りの数値をまとめて変換する
+    table = np.fromstring(text, sep=' ').reshape(-1, COLUMNS[field])
+    row = table[:, 0].astype(np.int64) - 1
+    col = table[:, 1].astype(np.int64) - 1
+    if field == 'pattern':
+        value = np.ones(row.size)
+    elif field == 'complex':
+        value = table[:, 2] + 1j * table[:, 3]
+    else:
+        value = table[:, 2]
+    return row, col, value
+
+
+def _read_range(path, begin, end, meta):
+    with open(path, 'rb') as f:
+        f.seek(begin)
+        return _parse(f.read(end - begin), meta)
+
+
+# 対称行列なら下三角(上三角)から反対側を補う
+def _entries(entries, meta, expand):
+    row, col, value = entries
+    if expand and meta['symmetry'] != 'general':
+        off = row != col
+        mirror = value[off]
+        if meta['symmetry'] == 'skew-symmetric':
+            mirror = -mirror
+        elif meta['symmetry'] == 'hermitian':
+            mirror = np.conj(mirror)
+        row, col, value = np.concatenate([row, col[off]]), np.concatenate([col, row[off]]), np.concatenate([value, mirror])
+    if meta['field'] == 'integer':
+        value = value.astype(np.int64)
+    return row, col, value
+
+
+def _read(path, meta, num_of_process):
+    if path.endswith('.gz'):
+        # 圧縮ファイルは位置を指定して読めないので1プロセスで読む
+        with _open(path) as f:
+            f.seek(meta['offset'])
+            return _parse(f.read(), meta)
+    if num_of_process is None:
+        # C++実装はファイル全体を複数スレッドで変換する
+        num_of_process = 1 if FAST_MMREAD else os.cpu_count()
+    size = os.path.getsize(path) - meta['offset']
+    num_of_chunk = max(1, min(num_of_process, -(-size // CHUNK_BYTES)))
+    ranges = _ranges(path, meta['offset'], num_of_chunk)
+    if len(ranges) == 1:
+        return _read_range(path, *ranges[0], meta)
+    with ProcessPoolExecutor(len(ranges)) as pool:
+        parts = list(pool.map(_read_range, *zip(*[(path, begin, end, meta) for begin, end in ranges])))
+    return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+
+def mmread(path, num_of_process=None, expand=True, cache=None):
+    """Matrix Marketファイルを並列に読み込みCSRで返す
+
+    本体を行の境界で分けたバイト範囲ごとに別プロセスで数値へ変換し, CSRを組み立てる.
+    密行列(array形式)はscipy.io.mmreadで読む.
+
+    Args:
+        path (str): ファイル名(.mtx, .mtx.gz)
+        num_of_process (int, optional): プロセス数. Noneならscipyの C++実装があれば1(内部で複数スレッド), 無ければ全コア
+        expand (bool, optional): Trueなら対称行列の反対側の三角を補う
+        cache (str, optional): 指定するとキャッシュ形式(cache.save)でも書き出す
+
+    Returns:
+        scipy.sparse.csr_matrix: 読み込んだ行列
+    """
+    meta = header(path)
+    if meta['layout'] != 'coordinate':
+        A = scipy.io.mmread(path)
+    else:
+        row, col, value = _entries(_read(path, meta, num_of_process), meta, expand)
+        A = compress(scipy.sparse.csr_matrix((value, (row, col)), shape=meta['shape']))
+    if cache is not None:
+        from .cache import save
+        save(A, cache)
+    return A
+
+
+def mmread_rows(comm, path, expand=True):
+    """MPI: 各ランクが担当行(N // プロセス数 ずつ)のみを持つCSRを返す
+
+    各ランクが本体の1/プロセス数のバイト範囲のみを数値へ変換し,
+    要素を担当ランクへ送り合って行ブロックを組み立てる(ファイル全体を読むランクは無い).
+
+    Args:
+        comm: MPIコミュニケータ
+        path (str): ファイル名(.mtx)
+        expand (bool, optional): Trueなら対称行列の反対側の三角を補う
+
+    Returns:
+        scipy.sparse.csr_matrix: 行ブロック A[rank * local_N:(rank + 1) * local_N]
+    """
+    rank, size = comm.Get_rank(), comm.Get_size()
+    meta = header(path)
+    N, M = meta['shape']
+    if N % size:
+        raise ValueError(f'N={ N } is not divisible by the number of processes { size }')
+    local_N = N // size
+    if path.endswith('.gz') or meta['layout'] != 'coordinate':
+        A = mmread(path, 1, expand) if rank == 0 else None
+        A = comm.bcast(A, root=0)
+        return A[rank*local_N:(rank+1)*local_N]
+
+    ranges = _ranges(path, meta['offset'], size) if rank == 0 else None
+    ranges = comm.bcast(ranges, root=0)
+    if rank < len(ranges):
+        entries = _read_range(path, *ranges[rank], meta)
+    else:
+        entries = _parse(b'', meta)
+    row, col, value = _entries(entries, meta, expand)
+
+    # 担当ランクへ要素を送る
+    owner = row // local_N
+    order = np.argsort(owner, kind='stable')
+    bounds = np.searchsorted(owner[order], np.arange(size + 1))
+    sends = [(row[order[bounds[r]:bounds[r+1]]], col[order[bounds[r]:bounds[r+1]]], value[order[bounds[r]:bounds[r+1]]])
+             for r in range(size)]
+    received = comm.alltoall(sends)
+    row = np.concatenate([r for r, _, _ in received]) - rank * local_N
+    col = np.concatenate([c for _, c, _ in received])
+    value = np.concatenate([v for _, _, v in received])
+    return compress(scipy.sparse.csr_matrix((value, (row, col)), shape=(local_N, M)))
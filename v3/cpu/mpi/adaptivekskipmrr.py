@@ -2,19 +2,20 @@ import numpy as np
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init, MultiCpu
+from .common import start, finish, init, distribute, MultiCpu
+from ..timer import BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
-def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
+def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None, layout='allgather') -> tuple:
     # MPI初期化
     rank = comm.Get_rank()
-    MultiCpu.joint_mpi(comm)
 
     # 初期化
     T = float64
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(
         b, x, maxiter)
-    MultiCpu.alloc(local_A, T)
+    A = MultiCpu.prepare(comm, local_A, T)
+    timer = A.new_timer()
     Ax = np.zeros(N, T)
     Ar = np.zeros((k + 2, N), T)
     Ay = np.zeros((k + 1, N), T)
@@ -29,7 +30,7 @@ def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=N
     k_history[0] = k
 
     # 初期残差
-    MultiCpu.dot(local_A, x, out=Ax)
+    A.dot(x, out=Ax)
     Ar[0] = b - Ax
     residual[0] = norm(Ar[0]) / b_norm
 
@@ -38,9 +39,8 @@ def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=N
     pre_residual = residual[0].copy()
 
     # 初期反復
-    if rank == 0:
-        start_time = start(method_name='Adaptive k-skip MrR + MPI', k=k)
-    MultiCpu.dot(local_A, Ar[0], out=Ar[1])
+    start_time = start(method_name='Adaptive k-skip MrR + MPI', k=k, verbose=rank == 0)
+    A.dot(Ar[0], out=Ar[1])
     rAr = dot(Ar[0], Ar[1])
     ArAr = dot(Ar[1], Ar[1])
 
@@ -57,8 +57,10 @@ def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=N
 
     # 反復計算
     while i < maxiter:
+        t = timer.tic()
         pre_residual = cur_residual
         cur_residual = norm(Ar[0]) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         residual[index] = cur_residual
 
         # 残差減少判定
@@ -66,8 +68,9 @@ def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=N
             # 解と残差を再計算
             x = pre_x.copy()
 
-            MultiCpu.dot(local_A, x, out=Ax)
-            MultiCpu.dot(local_A, Ar[0], out=Ar[1])
+            A.dot(x, out=Ax)
+            A.dot(Ar[0], out=Ar[1])
+            t = timer.toc(BASIS, t)
             rAr = dot(Ar[0], Ar[1])
             ArAr = dot(Ar[1], Ar[1])
 
@@ -76,11 +79,13 @@ def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=N
             z = -zeta * Ar[0]
             Ar[0] -= Ay[0]
             x -= z
+            t = timer.toc(UPDATE, t)
 
             i += 1
             index += 1
             num_of_solution_updates[index] = i
             residual[index] = norm(Ar[0]) / b_norm
+            t = timer.toc(CONVERGENCE, t)
 
             # kを下げて収束を安定化させる
             if k > 1:
@@ -88,38 +93,47 @@ def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=N
             k_history[index] = k
         else:
             pre_x = x.copy()
+            t = timer.toc(UPDATE, t)
 
         # 収束判定
         if cur_residual < tol:
             isConverged = True
             break
 
-        # 基底計算
-        for j in range(1, k + 2):
-            MultiCpu.dot(local_A, Ar[j-1], out=Ar[j])
-        for j in range(1, k + 1):
-            MultiCpu.dot(local_A, Ay[j-1], out=Ay[j])
-
-        # 係数計算
-        for j in range(2 * k + 3):
-            jj = j // 2
-            alpha[j] = dot(Ar[jj], Ar[jj + j % 2])
-        for j in range(1, 2 * k + 2):
-            jj = j//2
-            beta[j] = dot(Ay[jj], Ar[jj + j % 2])
-        for j in range(2 * k + 1):
-            jj = j // 2
-            delta[j] = dot(Ay[jj], Ay[jj + j % 2])
+        # 基底計算・係数計算はBLASのスレッドを広げる(KRYLOV_BLAS_WIDE)
+        with A.blas.widen():
+            # 基底計算
+            for j in range(1, k + 2):
+                A.dot(Ar[j-1], out=Ar[j])
+            for j in range(1, k + 1):
+                A.dot(Ay[j-1], out=Ay[j])
+            t = timer.toc(BASIS, t)
+
+            # 係数計算
+            for j in range(2 * k + 3):
+                jj = j // 2
+                alpha[j] = dot(Ar[jj], Ar[jj + j % 2])
+            for j in range(1, 2 * k + 2):
+                jj = j//2
+                beta[j] = dot(Ay[jj], Ar[jj + j % 2])
+            for j in range(2 * k + 1):
+                jj = j // 2
+                delta[j] = dot(Ay[jj], Ay[jj + j % 2])
+            t = timer.toc(COEFFICIENTS, t)
 
         # MrRでの1反復(解と残差の更新)
         d = alpha[2] * delta[0] - beta[1] ** 2
         zeta = alpha[1] * delta[0] / d
         eta = -alpha[1] * beta[1] / d
+        t = timer.toc(RECURRENCE, t)
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
         Ar[0] -= Ay[0]
-        MultiCpu.dot(local_A, Ar[0], out=Ar[1])
+        t = timer.toc(UPDATE, t)
+        A.dot(Ar[0], out=Ar[1])
+        t = timer.toc(BASIS, t)
         x -= z
+        t = timer.toc(UPDATE, t)
 
         # MrRでのk反復
         for j in range(k):
@@ -141,11 +155,14 @@ def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=N
             d = alpha[2] * delta[0] - beta[1] ** 2
             zeta = alpha[1] * delta[0] / d
             eta = -alpha[1] * beta[1] / d
-            MultiCpu.dot(local_A, Ar[0], out=Ar[1])
+            t = timer.toc(RECURRENCE, t)
+            A.dot(Ar[0], out=Ar[1])
+            t = timer.toc(BASIS, t)
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
             Ar[0] -= Ay[0]
             x -= z
+            t = timer.toc(UPDATE, t)
 
         i += (k + 1)
         index += 1
@@ -155,14 +172,18 @@ def adaptivekskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=N
         isConverged = False
         residual[index] = norm(Ar[0]) / b_norm
 
-    if rank == 0:
-        elapsed_time = finish(start_time, isConverged, i, residual[index], k)
-        info = {
-            'time': elapsed_time,
-            'nosl': num_of_solution_updates[:index+1],
-            'residual': residual[:index+1],
-            'khistory': k_history[:index+1],
-        }
-        return x, info
-    else:
-        exit(0)
+    elapsed_time = finish(start_time, isConverged, i, residual[index], k, verbose=rank == 0, comm=comm)
+    info = {
+        'time': elapsed_time,
+        'nosl': num_of_solution_updates[:index+1],
+        'residual': residual[:index+1],
+        'threads': A.blas.info(),
+        'khistory': k_history[:index+1],
+    }
+    A.summarize(info, 'adaptivekskipmrr', k)
+
+    # この求解で確保した通信資源を解放する
+    if A is not local_A:
+        A.free()
+
+    return distribute(x, comm, A.local_N, layout), info
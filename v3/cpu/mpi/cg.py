@@ -2,22 +2,23 @@ import numpy as np
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init, MultiCpu
+from .common import start, finish, init, distribute, MultiCpu
+from ..timer import BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
-def cg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None) -> tuple:
+def cg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None, layout='allgather') -> tuple:
     # MPI初期化
     rank = comm.Get_rank()
-    MultiCpu.joint_mpi(comm)
 
     # 初期化
     T = float64
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiCpu.alloc(local_A, T)
+    A = MultiCpu.prepare(comm, local_A, T)
+    timer = A.new_timer()
     Ax = np.zeros(N, T)
     v = np.zeros(N, T)
 
     # 初期残差
-    MultiCpu.dot(local_A, x, out=Ax)
+    A.dot(x, out=Ax)
     r = b - Ax
     p = r.copy()
     gamma = dot(r, r)
@@ -25,38 +26,50 @@ def cg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None,
     # 反復計算
     i = 0
 
-    if rank == 0:
-        start_time = start(method_name='CG + MPI')
+    start_time = start(method_name='CG + MPI', verbose=rank == 0)
     while i < maxiter:
         # 収束判定
+        t = timer.tic()
         residual[i] = norm(r) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         if residual[i] < tol:
             isConverged = True 
             break
 
         # 解の更新
-        MultiCpu.dot(local_A, p, out=v)
+        A.dot(p, out=v)
+        t = timer.toc(BASIS, t)
         sigma = dot(p, v)
+        t = timer.toc(COEFFICIENTS, t)
         alpha = gamma / sigma
+        t = timer.toc(RECURRENCE, t)
         x += alpha * p
         r -= alpha * v
+        t = timer.toc(UPDATE, t)
         old_gamma = gamma.copy()
         gamma = dot(r, r)
+        t = timer.toc(COEFFICIENTS, t)
         beta = gamma / old_gamma
+        t = timer.toc(RECURRENCE, t)
         p = r + beta * p
+        timer.toc(UPDATE, t)
         i += 1
         num_of_solution_updates[i] = i
     else:
         isConverged = False
         residual[i] = norm(r) / b_norm
 
-    if rank == 0:
-        elapsed_time = finish(start_time, isConverged, i, residual[i])
-        info = {
-            'time': elapsed_time,
-            'nosl': num_of_solution_updates[:i+1],
-            'residual': residual[:i+1],
-        }
-        return x, info
-    else:
-        exit(0)
+    elapsed_time = finish(start_time, isConverged, i, residual[i], verbose=rank == 0, comm=comm)
+    info = {
+        'time': elapsed_time,
+        'nosl': num_of_solution_updates[:i+1],
+        'residual': residual[:i+1],
+        'threads': A.blas.info(),
+    }
+    A.summarize(info, 'cg')
+
+    # この求解で確保した通信資源を解放する
+    if A is not local_A:
+        A.free()
+
+    return distribute(x, comm, A.local_N, layout), info
@@ -1,43 +1,330 @@
+import json
+import os
+
 import numpy as np
 import scipy
 from numpy.linalg import norm
 
 from mpi4py import MPI
 
-from ..common import _start, _finish, init
+from ..common import _start, _finish, init, operator
+from ..blas import BlasThreads
+from ..symmetric import SymmetricCsr
+from ..timer import Timer, COMMUNICATION
+from .. import roofline, trace
+from . import imbalance
 
 
-def start(method_name='', k=None):
-    _start(method_name, k)
+def start(method_name='', k=None, verbose=True):
+    if verbose:
+        _start(method_name, k)
+    if trace.tracer is not None:
+        trace.tracer.name = method_name if k is None else f'{ method_name } (k={ k })'
     return MPI.Wtime()
 
 
-def finish(start_time, isConverged, num_of_iter, final_residual, final_k=None):
-    elapsed_time = MPI.Wtime() - start_time
-    _finish(elapsed_time, isConverged, num_of_iter, final_residual, final_k)
+# commを渡すとトレースを全ランク分まとめて書き出す(集団通信)
+def finish(start_time, isConverged, num_of_iter, final_residual, final_k=None, verbose=True, comm=None):
+    end_time = MPI.Wtime()
+    elapsed_time = end_time - start_time
+    if verbose:
+        _finish(elapsed_time, isConverged, num_of_iter, final_residual, final_k)
+    if trace.tracer is not None:
+        trace.tracer.span(trace.tracer.name, 'solve', start_time, end_time)
+        write_trace(trace.tracer, comm)
     return elapsed_time
 
 
+def write_trace(tracer, comm=None):
+    """全ランクの前回から増えた区間を1つのChrome traceにまとめ, ランク0が書き出す
+
+    各ランクのMPI.Wtimeは最初の書き出しで同期(Barrier)直後に読んだ値の差でランク0の時計に合わせ,
+    全ランクで最も早い開始を時刻0とする(以降の書き出しも同じ時刻0を使う).
+    トラック番号はCOMM_WORLDでのランク. サブコミュニケータ(ensemble)では
+    ファイル名に先頭ランクの番号を加える.
+
+    Args:
+        tracer (Tracer): 記録した区間
+        comm (optional): MPIコミュニケータ. Noneなら自ランクの区間のみ(ファイル名にランクを加える)
+    """
+    pid = MPI.COMM_WORLD.Get_rank()
+    root, extension = os.path.splitext(tracer.path)
+    if comm is None:
+        tracer.write(path=f'{ root }.{ pid }{ extension }')
+        return
+    if tracer.zero is None:
+        comm.Barrier()
+        now = MPI.Wtime()
+        offset = now - comm.bcast(now, root=0)
+        tracer.zero = comm.allreduce(tracer.origin() - offset, op=MPI.MIN) + offset
+    events = comm.gather(tracer.take(pid), root=0)
+    if comm.Get_rank() != 0:
+        return
+    path = tracer.path
+    if comm.Get_size() != MPI.COMM_WORLD.Get_size():
+        path = f'{ root }.{ pid }{ extension }'
+    tracer.write(sum(events, []), path)
+
+
+# 解の返し方
+# 'allgather': 全ランクが解全体を返す, 'scatter': 各ランクが担当行のみを返す
+def distribute(x, comm, local_N, layout='allgather'):
+    if layout == 'allgather':
+        return x
+    if layout == 'scatter':
+        begin = comm.Get_rank() * local_N
+        return x[begin:begin+local_N].copy()
+    raise ValueError(f"layout must be 'allgather' or 'scatter', not '{ layout }'")
+
+
+class Communication(object):
+    """通信層: 通信の回数・送受信バイト数・時間を種類ごとに記録する
+
+    KRYLOV_COMM_STATS=1 (または enabled=True) で記録する. 時間はtimerが有効なら
+    通信待ち(COMMUNICATION)としても数える(トレースでは通信の種類名の区間になる).
+    どちらも無効なら元の通信をそのまま呼ぶ.
+    バイト数は自ランクが他ランクへ送る量・他ランクから受け取る量(通信アルゴリズムによらない論理量).
+
+    Args:
+        enabled (bool, optional): Noneなら環境変数 KRYLOV_COMM_STATS
+        timer (Timer, optional): 通信待ちを加えるフェーズ計測
+    """
+
+    def __init__(self, enabled=None, timer=None):
+        if enabled is None:
+            enabled = os.environ.get('KRYLOV_COMM_STATS', '0') == '1'
+        self.enabled = enabled
+        self.timer = timer if timer is not None else Timer(False)
+        # 種類 -> [回数, 送信バイト数, 受信バイト数, 時間]
+        self.records = {}
+
+    def _run(self, name, sent, received, function, *args):
+        if not (self.enabled or self.timer.enabled):
+            return function(*args)
+        start = MPI.Wtime()
+        result = function(*args)
+        # timerが無効ならtocは0を返す
+        end = self.timer.toc(COMMUNICATION, start, name) or MPI.Wtime()
+        if self.enabled:
+            record = self.records.get(name)
+            if record is None:
+                record = self.records[name] = [0, 0, 0, 0.0]
+            record[0] += 1
+            record[1] += sent
+            record[2] += received
+            record[3] += end - start
+        return result
+
+    def Allgather(self, comm, sendbuf, recvbuf):
+        others = comm.Get_size() - 1
+        return self._run('Allgather', sendbuf.nbytes * others, recvbuf.nbytes - sendbuf.nbytes,
+                         comm.Allgather, sendbuf, recvbuf)
+
+    # recvbuf: [配列, (要素数, 先頭位置)]. sendbufはMPI.IN_PLACEのみ
+    def Allgatherv(self, comm, sendbuf, recvbuf):
+        buf, (counts, _) = recvbuf
+        own = counts[comm.Get_rank()] * buf.itemsize
+        total = sum(counts) * buf.itemsize
+        return self._run('Allgatherv', own * (comm.Get_size() - 1), total - own,
+                         comm.Allgatherv, sendbuf, recvbuf)
+
+    def Reduce_scatter_block(self, comm, sendbuf, recvbuf):
+        return self._run('Reduce_scatter_block', sendbuf.nbytes - recvbuf.nbytes, recvbuf.nbytes * (comm.Get_size() - 1),
+                         comm.Reduce_scatter_block, sendbuf, recvbuf)
+
+    def Barrier(self, comm):
+        return self._run('Barrier', 0, 0, comm.Barrier)
+
+    def summary(self, comm) -> dict:
+        """全ランクの記録を集める(集団通信)
+
+        Args:
+            comm: MPIコミュニケータ
+
+        Returns:
+            dict: {種類: {'calls', 'sent', 'received', 'time': ランクごとの値(ndarray)}}.
+                'total' は全種類の合計
+        """
+        gathered = comm.allgather(self.records)
+        names = sorted(set().union(*gathered))
+        summary = {}
+        for name in names + ['total']:
+            if name == 'total':
+                values = np.array([np.sum(list(records.values()) or [[0, 0, 0, 0.0]], axis=0) for records in gathered])
+            else:
+                values = np.array([records.get(name, [0, 0, 0, 0.0]) for records in gathered], np.float64)
+            summary[name] = {
+                'calls': values[:, 0].astype(np.int64),
+                'sent': values[:, 1].astype(np.int64),
+                'received': values[:, 2].astype(np.int64),
+                'time': values[:, 3],
+            }
+        return summary
+
+
+def export(path, summary, **labels) -> None:
+    """通信の記録(Communication.summary)をJSON Lines形式で追記する
+
+    1行が1種類の通信. k・プロセス数などの条件はlabelsで付け, 複数の実行を1つのファイルに集めて比較する.
+    ランク0のみで呼ぶ.
+
+    Args:
+        path (str): 出力ファイル
+        summary (dict): info['communication']
+        labels: 各行に加える値(method, kなど)
+    """
+    with open(path, 'a') as f:
+        for name, values in summary.items():
+            f.write(json.dumps(dict(
+                labels,
+                collective=name,
+                processes=len(values['calls']),
+                calls=int(values['calls'].max()),
+                sent=int(values['sent'].sum()),
+                received=int(values['received'].sum()),
+                time_max=float(values['time'].max()),
+                time_mean=float(values['time'].mean()),
+            )) + '\n')
+
+
 class MultiCpu(object):
-    # mpi
-    comm = None
-    # dim
-    local_N: int = 0
-    # out
-    out: np.ndarray = None
+    # 通信・行列・出力バッファはインスタンスごとに持つ
+    # (サブコミュニケータ/スレッドごとに別の求解を同時に実行できる)
 
-    @classmethod
-    def joint_mpi(cls, comm):
-        cls.comm = comm
+    def __init__(self, comm, local_A, T=np.float64, hierarchical=None, num_of_thread=None):
+        # mpi
+        self.comm = comm
+        # BLAS/OpenMPのスレッド数: 指定が無ければノードのコアをノード内のプロセスで等分する
+        node_comm = comm.Split_type(MPI.COMM_TYPE_SHARED, key=comm.Get_rank())
+        self.blas = BlasThreads(num_of_thread, node_comm.Get_size()).apply()
+        node_comm.Free()
+        # NODE_AWARE=1 でノード内集約 → リーダー間集約の2段通信にする
+        if hierarchical is None:
+            hierarchical = os.environ.get('NODE_AWARE', '0') == '1'
+        self.hierarchical = hierarchical
+        self.node_comm = None
+        self.leader_comm = None
+        # matrix
+        self.A = operator(local_A, comm.Get_rank() * local_A.shape[0])
+        self.T = T
+        # dim
+        self.local_N, self.N = local_A.shape
+        self.begin = comm.Get_rank() * self.local_N
+        self.end = self.begin + self.local_N
+        # out
+        self.out = np.zeros(self.local_N, T)
+        self.lower = np.zeros(self.local_N, T)
+        # ノード共有メモリ(ダブルバッファ)
+        self.wins = []
+        self.shared = []
+        self.shared_index = 0
+        self.counts = None
+        self.displs = None
+        if self.hierarchical:
+            self.alloc_shared()
+        # フェーズ計測・通信の記録(求解ごとにnew_timerで作り直す)
+        self.timer = Timer(False)
+        self.communication = Communication(False)
 
+    # 用意済みの演算子はそのまま使う
     @classmethod
-    def alloc(cls, local_A, T):
-        cls.local_N = local_A.shape[0]
-        cls.A = local_A
-        cls.out = np.zeros(cls.local_N, T)
+    def prepare(cls, comm, local_A, T=np.float64):
+        if isinstance(local_A, cls):
+            return local_A
+        return cls(comm, local_A, T)
 
-    @classmethod
-    def dot(cls, _, x, out):
-        cls.out = cls.A.dot(x)
-        cls.comm.Allgather(cls.out, out)
-        return out
\ No newline at end of file
+    def alloc_shared(self):
+        # ノード内で共有する出力ベクトルを確保する
+        # 同一ノードのランクが連続していない場合は通常のAllgatherを使う
+        rank = self.comm.Get_rank()
+        node_comm = self.comm.Split_type(MPI.COMM_TYPE_SHARED, key=rank)
+        node_ranks = node_comm.allgather(rank)
+        contiguous = node_ranks == list(range(node_ranks[0], node_ranks[0] + len(node_ranks)))
+        if not self.comm.allreduce(contiguous, op=MPI.LAND):
+            node_comm.Free()
+            self.hierarchical = False
+            return
+
+        self.node_comm = node_comm
+        is_leader = node_comm.Get_rank() == 0
+        self.leader_comm = self.comm.Split(0 if is_leader else MPI.UNDEFINED, rank)
+
+        # ノード単位のブロック(要素数・先頭位置)
+        if is_leader:
+            blocks = self.leader_comm.allgather((rank * self.local_N, len(node_ranks) * self.local_N))
+            self.displs = [displ for displ, _ in blocks]
+            self.counts = [count for _, count in blocks]
+
+        # 書き込みと読み出しが重ならないよう2面確保する
+        itemsize = np.dtype(self.T).itemsize
+        for _ in range(2):
+            size = self.N * itemsize if is_leader else 0
+            win = MPI.Win.Allocate_shared(size, itemsize, comm=node_comm)
+            buf, _ = win.Shared_query(0)
+            self.wins.append(win)
+            self.shared.append(np.ndarray(buffer=buf, dtype=self.T, shape=(self.N,)))
+
+    # 求解ごとのフェーズ計測と通信の記録を新しくする. 通信待ちはdotの通信層で数える
+    def new_timer(self):
+        self.timer = Timer(clock=MPI.Wtime)
+        self.communication = Communication(timer=self.timer)
+        return self.timer
+
+    # 有効な計測の結果をinfoに加える(集団通信): フェーズ時間, 負荷の偏り, 演算数・転送量, 通信の記録
+    # roofline はランクごとの結果の一覧(各ランクのSTREAMは最初の1度だけ, 同時に測る)
+    def summarize(self, info, method, k=0):
+        if self.timer.enabled:
+            local = self.timer.summary()
+            info['timings'] = self.timer.summary(self.comm)
+            wait = self.timer.elapsed[COMMUNICATION]
+            # 通信待ちはbasisにも含まれる
+            compute = sum(self.timer.elapsed) - 2 * wait
+            info['imbalance'] = imbalance.analyse(self.comm, compute, wait, getattr(self.A, 'nnz', 0), self.local_N)
+            if roofline.enabled():
+                self.comm.Barrier()
+                bandwidth = roofline.reference()
+                info['roofline'] = self.comm.allgather(roofline.analyse(method, info, local, self.A, self.N, k, bandwidth))
+        if self.communication.enabled:
+            info['communication'] = self.communication.summary(self.comm)
+        return info
+
+    # 確保した通信資源を解放し, スレッド数を元に戻す
+    def free(self):
+        self.blas.restore()
+        for win in self.wins:
+            win.Free()
+        self.wins = []
+        self.shared = []
+        for comm in (self.leader_comm, self.node_comm):
+            if comm is not None and comm != MPI.COMM_NULL:
+                comm.Free()
+        self.node_comm = None
+        self.leader_comm = None
+        self.hierarchical = False
+
+    # 自分の行の積
+    def local_dot(self, x):
+        if not isinstance(self.A, SymmetricCsr):
+            return self.A.dot(x)
+        # 対称半分格納: 転置側の寄与を全ランクで集約し, 自分の区間を受け取る
+        self.communication.Reduce_scatter_block(self.comm, self.A.dot_lower(x[self.begin:self.end]), self.lower)
+        return self.lower + self.A.dot_upper(x)
+
+    def dot(self, x, out):
+        if not self.hierarchical:
+            self.out = self.local_dot(x)
+            self.communication.Allgather(self.comm, self.out, out)
+            return out
+
+        # ノード内: 各ランクが共有ベクトルの自分の区間へ直接書き込む
+        shared = self.shared[self.shared_index]
+        self.shared_index ^= 1
+        shared[self.begin:self.end] = self.local_dot(x)
+        self.communication.Barrier(self.node_comm)
+        # ノード間: リーダーのみがノード単位のブロックを交換する
+        if self.leader_comm != MPI.COMM_NULL:
+            self.communication.Allgatherv(self.leader_comm, MPI.IN_PLACE, [shared, (self.counts, self.displs)])
+        self.communication.Barrier(self.node_comm)
+        # 共有窓は2つの積の後に上書きされるので, 求解関数のベクトルへ写す(ノード内のメモリは減らない)
+        out[:] = shared
+        return out
@@ -0,0 +1,148 @@
+import importlib
+import math
+
+from mpi4py import MPI
+
+# タグ
+TAG_READY = 1
+TAG_TASK = 2
+
+
+# 問題サイズからグループのプロセス数を決める
+# (Nを割り切り, 1プロセスあたりmin_rows行以上となる最大のプロセス数)
+def group_size_for(N: int, num_of_process: int, min_rows: int = 50000) -> int:
+    for size in range(max(num_of_process, 1), 0, -1):
+        if N % size == 0 and N // size >= min_rows:
+            return size
+    return 1
+
+
+def _solver(method):
+    if callable(method):
+        return method
+    module = importlib.import_module(f'.{method}', __package__)
+    return getattr(module, method)
+
+
+# グループ内で1つの連立方程式を解く
+def _solve(group, solver, systems, index, kwargs):
+    A, b = systems[index]
+    local_N = b.size // group.Get_size()
+    begin = group.Get_rank() * local_N
+    local_A = A[begin:begin + local_N]
+    return solver(group, local_A, b, **kwargs)
+
+
+def ensemble(comm, systems, method='cg', group_size=None, min_rows=50000, **kwargs) -> tuple:
+    """独立な複数の連立方程式をサブコミュニケータのグループで並行に解く
+
+    rank 0 は作業キューを持ち, 手の空いたグループに次の問題を渡す(動的負荷分散).
+    systems は全ランクから (A, b) を取り出せる列(遅延読み込みでもよい).
+
+    Args:
+        comm: MPIコミュニケータ(通常はCOMM_WORLD)
+        systems: (A, b) の列
+        method (str or callable): 'cg', 'mrr', 'kskipcg', 'kskipmrr', 'adaptivekskipmrr' または求解関数
+        group_size (int, optional): 1グループのプロセス数. Noneなら問題サイズから決める
+        min_rows (int, optional): group_size自動決定時の1プロセスあたり最小行数
+        **kwargs: 求解関数へ渡す引数(tol, maxiter, k など)
+
+    Returns:
+        tuple: rank 0 では (解のリスト, infoのリスト), それ以外では (None, None)
+
+    Raises:
+        ValueError: group_size で割り切れない大きさの問題がある場合(全ランク)
+        RuntimeError: いずれかの問題の求解が例外を送出した場合(rank 0, 全問題の処理後)
+    """
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+    solver = _solver(method)
+    num_of_systems = len(systems)
+    xs = [None] * num_of_systems
+    infos = [None] * num_of_systems
+
+    # 1プロセスのときは順に解く
+    if size == 1:
+        start_time = MPI.Wtime()
+        for index in range(num_of_systems):
+            xs[index], infos[index] = _solve(comm, solver, systems, index, kwargs)
+        _report(num_of_systems, 1, 1, MPI.Wtime() - start_time)
+        return xs, infos
+
+    # rank 0 を除いたプロセスをグループに分割する
+    # グループ内では行を等分するので, 全ての問題の大きさがgroup_sizeで割り切れる必要がある
+    # 大きさはrank 0だけが読み, 各問題はそれを解くグループだけが読み込む
+    sizes = comm.bcast([systems[index][1].size for index in range(num_of_systems)] if rank == 0 else None, root=0)
+    if group_size is None:
+        group_size = group_size_for(math.gcd(*sizes), size - 1, min_rows)
+    num_of_groups = (size - 1) // group_size
+    if num_of_groups == 0:
+        raise ValueError(f'group_size={group_size} requires at least {group_size + 1} processes')
+    indivisible = [index for index, N in enumerate(sizes) if N % group_size != 0]
+    if indivisible:
+        raise ValueError(f'group_size={group_size} does not divide the size of systems {indivisible}')
+    worker = rank - 1
+    color = worker // group_size if 0 <= worker < num_of_groups * group_size else MPI.UNDEFINED
+    group = comm.Split(color, rank)
+
+    # 作業キュー(rank 0)
+    if rank == 0:
+        start_time = MPI.Wtime()
+        status = MPI.Status()
+        next_index = 0
+        num_of_active = num_of_groups
+        failures = {}
+        while num_of_active > 0:
+            result = comm.recv(source=MPI.ANY_SOURCE, tag=TAG_READY, status=status)
+            if result is not None:
+                index, x, info, error = result
+                xs[index], infos[index] = x, info
+                if error is not None:
+                    failures[index] = error
+            if next_index < num_of_systems:
+                comm.send(next_index, dest=status.Get_source(), tag=TAG_TASK)
+                next_index += 1
+            else:
+                comm.send(None, dest=status.Get_source(), tag=TAG_TASK)
+                num_of_active -= 1
+        _report(num_of_systems, num_of_groups, group_size, MPI.Wtime() - start_time)
+        if failures:
+            raise RuntimeError('failed to solve systems: ' + ', '.join(f'{ index } ({ error })' for index, error in sorted(failures.items())))
+        return xs, infos
+
+    # 余ったプロセスは参加しない
+    if group == MPI.COMM_NULL:
+        return None, None
+
+    # グループ: リーダーが問題を受け取り, グループ内へ配る
+    is_leader = group.Get_rank() == 0
+    result = None
+    while True:
+        if is_leader:
+            comm.send(result, dest=0, tag=TAG_READY)
+            index = comm.recv(source=0, tag=TAG_TASK)
+        else:
+            index = None
+        index = group.bcast(index, root=0)
+        if index is None:
+            break
+        # 求解の失敗はrank 0へ返す(rank 0 が結果を待ち続けないように)
+        try:
+            x, info = _solve(group, solver, systems, index, kwargs)
+            error = None
+        except Exception as e:
+            x, info, error = None, None, f'{ type(e).__name__ }: { e }'
+        errors = [e for e in group.gather(error, root=0) or [] if e is not None]
+        result = (index, x, info, errors[0] if errors else None) if is_leader else None
+
+    group.Free()
+    return None, None
+
+
+def _report(num_of_systems, num_of_groups, group_size, elapsed_time):
+    print('# ', '='*15, ' ENSEMBLE ', '='*13, ' #', sep='')
+    print(f'Systems:\t{ num_of_systems }')
+    print(f'Groups:\t\t{ num_of_groups } x { group_size } procs')
+    print(f'Time:\t\t{ elapsed_time } s')
+    print(f'Throughput:\t{ num_of_systems / elapsed_time * 3600 } solves/h')
+    print('# ', '='*38, ' #', sep='')
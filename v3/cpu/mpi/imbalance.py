@@ -0,0 +1,68 @@
+import numpy as np
+
+# 平均よりこの割合以上大きいランクを遅いランク・仕事の多い区間とみなす
+THRESHOLD = 0.1
+
+
+# 最大 / 平均 (1なら均等)
+def _ratio(values) -> float:
+    mean = values.mean()
+    return float(values.max() / mean) if mean > 0 else 1.0
+
+
+def analyse(comm, compute, wait, nnz, rows, threshold=THRESHOLD) -> dict:
+    """ランク間の負荷の偏りを調べる(集団通信)
+
+    遅いランクは計算時間が平均より大きいランク. その担当区間の非零要素数も平均より大きければ
+    原因は分割('partition'), そうでなければランク自体(コア・ノードの性能やノイズ, 'rank')とする.
+
+    Args:
+        comm: MPIコミュニケータ
+        compute (float): 自ランクの計算時間(秒, 通信待ちを除く)
+        wait (float): 自ランクの通信待ち時間(秒)
+        nnz (int): 自ランクの非零要素数
+        rows (int): 自ランクの行数
+        threshold (float, optional): 平均からの超過の割合
+
+    Returns:
+        dict: ランクごとの値('compute', 'wait', 'nnz', 'rows'), 最大/平均('imbalance'),
+            遅いランク('stragglers': [(ランク, 原因)]), 仕事の多い区間('heavy')
+    """
+    values = np.array(comm.allgather((compute, wait, nnz, rows)), np.float64)
+    compute, wait, nnz, rows = values.T
+    slow = np.flatnonzero(compute > compute.mean() * (1 + threshold))
+    heavy = np.flatnonzero(nnz > nnz.mean() * (1 + threshold))
+    return {
+        'compute': compute,
+        'wait': wait,
+        'nnz': nnz.astype(np.int64),
+        'rows': rows.astype(np.int64),
+        'imbalance': {'compute': _ratio(compute), 'nnz': _ratio(nnz), 'rows': _ratio(rows)},
+        # 計算の偏りで失われた割合: 1 - 平均 / 最大
+        'lost': float(1 - compute.mean() / compute.max()) if compute.max() > 0 else 0.0,
+        'stragglers': [(int(r), 'partition' if r in heavy else 'rank') for r in slow],
+        'heavy': [int(r) for r in heavy],
+    }
+
+
+def report(summary) -> str:
+    """analyseの結果を表形式の文字列にする
+
+    Args:
+        summary (dict): info['imbalance']
+
+    Returns:
+        str: ランクごとの表と, 偏り・遅いランクの要約
+    """
+    stragglers = dict(summary['stragglers'])
+    lines = ['rank\tcompute[s]\twait[s]\tnnz\t\trows']
+    for rank in range(len(summary['compute'])):
+        mark = f'\t<- { stragglers[rank] }' if rank in stragglers else ''
+        lines.append(f'{ rank }\t{ summary["compute"][rank]:.3e}\t{ summary["wait"][rank]:.3e}\t'
+                     f'{ summary["nnz"][rank] }\t\t{ summary["rows"][rank] }{ mark }')
+    imbalance = summary['imbalance']
+    lines.append(f'max/mean: compute { imbalance["compute"]:.2f}, nnz { imbalance["nnz"]:.2f}, rows { imbalance["rows"]:.2f}'
+                 f' (lost { 100 * summary["lost"]:.0f}% of compute time)')
+    if summary['heavy']:
+        lines.append(f'partitions with too much work: { summary["heavy"] }')
+    return '\n'.join(lines)
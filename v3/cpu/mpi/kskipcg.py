@@ -2,19 +2,20 @@ import numpy as np
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init, MultiCpu
+from .common import start, finish, init, distribute, MultiCpu
+from ..timer import BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
-def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
+def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None, layout='allgather') -> tuple:
     # MPI初期化
     rank = comm.Get_rank()
-    MultiCpu.joint_mpi(comm)
 
     # 初期化
     T = float64
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(
         b, x, maxiter)
-    MultiCpu.alloc(local_A, T)
+    A = MultiCpu.prepare(comm, local_A, T)
+    timer = A.new_timer()
     Ax = np.zeros(N, T)
     Ar = np.zeros((k + 2, N), T)
     Ap = np.zeros((k + 3, N), T)
@@ -23,47 +24,55 @@ def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, call
     c = np.zeros(2*k + 2, T)
 
     # 初期残差
-    MultiCpu.dot(local_A, x, out=Ax)
+    A.dot(x, out=Ax)
     Ar[0] = b - Ax
     Ap[0] = Ar[0].copy()
 
     # 反復計算
     i = 0
     index = 0
-    if rank == 0:
-        start_time = start(method_name='k-skip CG + MPI', k=k)
+    start_time = start(method_name='k-skip CG + MPI', k=k, verbose=rank == 0)
     while i < maxiter:
         # 収束判定
+        t = timer.tic()
         residual[index] = norm(Ar[0]) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         if residual[index] < tol:
             isConverged = True
             break
 
-        # 基底計算
-        for j in range(1, k + 1):
-            MultiCpu.dot(local_A, Ar[j-1], out=Ar[j])
-        for j in range(1, k + 2):
-            MultiCpu.dot(local_A, Ap[j-1], out=Ap[j])
+        # 基底計算・係数計算はBLASのスレッドを広げる(KRYLOV_BLAS_WIDE)
+        with A.blas.widen():
+            # 基底計算
+            for j in range(1, k + 1):
+                A.dot(Ar[j-1], out=Ar[j])
+            for j in range(1, k + 2):
+                A.dot(Ap[j-1], out=Ap[j])
+            t = timer.toc(BASIS, t)
 
-        # 係数計算
-        for j in range(2 * k + 1):
-            jj = j // 2
-            a[j] = dot(Ar[jj], Ar[jj + j % 2])
-        for j in range(2 * k + 4):
-            jj = j // 2
-            f[j] = dot(Ap[jj], Ap[jj + j % 2])
-        for j in range(2 * k + 2):
-            jj = j // 2
-            c[j] = dot(Ar[jj], Ap[jj + j % 2])
+            # 係数計算
+            for j in range(2 * k + 1):
+                jj = j // 2
+                a[j] = dot(Ar[jj], Ar[jj + j % 2])
+            for j in range(2 * k + 4):
+                jj = j // 2
+                f[j] = dot(Ap[jj], Ap[jj + j % 2])
+            for j in range(2 * k + 2):
+                jj = j // 2
+                c[j] = dot(Ar[jj], Ap[jj + j % 2])
+            t = timer.toc(COEFFICIENTS, t)
 
         # CGでの1反復
         # 解の更新
         alpha = a[0] / f[1]
         beta = alpha ** 2 * f[2] / a[0] - 1
+        t = timer.toc(RECURRENCE, t)
         x += alpha * Ap[0]
         Ar[0] -= alpha * Ap[1]
         Ap[0] = Ar[0] + beta * Ap[0]
-        MultiCpu.dot(local_A, Ap[0], out=Ap[1])
+        t = timer.toc(UPDATE, t)
+        A.dot(Ap[0], out=Ap[1])
+        t = timer.toc(BASIS, t)
 
         # CGでのk反復
         for j in range(k):
@@ -76,10 +85,13 @@ def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, call
             # 解の更新
             alpha = a[0] / f[1]
             beta = alpha ** 2 * f[2] / a[0] - 1
+            t = timer.toc(RECURRENCE, t)
             x += alpha * Ap[0]
             Ar[0] -= alpha * Ap[1]
             Ap[0] = Ar[0] + beta * Ap[0]
-            MultiCpu.dot(local_A, Ap[0], out=Ap[1])
+            t = timer.toc(UPDATE, t)
+            A.dot(Ap[0], out=Ap[1])
+            t = timer.toc(BASIS, t)
 
         i += (k + 1)
         index += 1
@@ -88,13 +100,17 @@ def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, call
         isConverged = False
         residual[index] = norm(Ar[0]) / b_norm
 
-    if rank == 0:
-        elapsed_time = finish(start_time, isConverged, i, residual[index])
-        info = {
-            'time': elapsed_time,
-            'nosl': num_of_solution_updates[:index+1],
-            'residual': residual[:index+1],
-        }
-        return x, info
-    else:
-        exit(0)
+    elapsed_time = finish(start_time, isConverged, i, residual[index], verbose=rank == 0, comm=comm)
+    info = {
+        'time': elapsed_time,
+        'nosl': num_of_solution_updates[:index+1],
+        'residual': residual[:index+1],
+        'threads': A.blas.info(),
+    }
+    A.summarize(info, 'kskipcg', k)
+
+    # この求解で確保した通信資源を解放する
+    if A is not local_A:
+        A.free()
+
+    return distribute(x, comm, A.local_N, layout), info
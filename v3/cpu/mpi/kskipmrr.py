@@ -2,20 +2,21 @@ import numpy as np
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init, MultiCpu
+from .common import start, finish, init, distribute, MultiCpu
+from ..timer import BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
-def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
+def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None, layout='allgather') -> tuple:
     # MPI初期化
     rank = comm.Get_rank()
-    MultiCpu.joint_mpi(comm)
 
     # 初期化
     T = float64
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(
         b, x, maxiter)
     Ax = np.zeros(N, T)
-    MultiCpu.alloc(local_A, T)
+    A = MultiCpu.prepare(comm, local_A, T)
+    timer = A.new_timer()
     Ar = np.zeros((k + 2, N), T)
     Ay = np.zeros((k + 1, N), T)
     rAr = np.zeros(1, T)
@@ -25,15 +26,14 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
     delta = np.zeros(2*k + 1, T)
 
     # 初期残差
-    MultiCpu.dot(local_A, x, out=Ax)
+    A.dot(x, out=Ax)
     Ar[0] = b - Ax
     residual[0] = norm(Ar[0]) / b_norm
 
     # 初期反復
-    if rank == 0:
-        start_time = start(method_name='k-skip MrR + MPI', k=k)
+    start_time = start(method_name='k-skip MrR + MPI', k=k, verbose=rank == 0)
 
-    MultiCpu.dot(local_A, Ar[0], out=Ar[1])
+    A.dot(Ar[0], out=Ar[1])
     rAr = dot(Ar[0], Ar[1])
     ArAr = dot(Ar[1], Ar[1])
 
@@ -50,37 +50,47 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
     # 反復計算
     while i < maxiter:
         # 収束判定
+        t = timer.tic()
         residual[index] = norm(Ar[0]) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         if residual[index] < tol:
             isConverged = True
             break
 
-        # 基底計算
-        for j in range(1, k + 2):
-            MultiCpu.dot(local_A, Ar[j-1], out=Ar[j])
-        for j in range(1, k + 1):
-            MultiCpu.dot(local_A, Ay[j-1], out=Ay[j])
-
-        # 係数計算
-        for j in range(2 * k + 3):
-            jj = j // 2
-            alpha[j] = dot(Ar[jj], Ar[jj + j % 2])
-        for j in range(1, 2 * k + 2):
-            jj = j//2
-            beta[j] = dot(Ay[jj], Ar[jj + j % 2])
-        for j in range(2 * k + 1):
-            jj = j // 2
-            delta[j] = dot(Ay[jj], Ay[jj + j % 2])
+        # 基底計算・係数計算はBLASのスレッドを広げる(KRYLOV_BLAS_WIDE)
+        with A.blas.widen():
+            # 基底計算
+            for j in range(1, k + 2):
+                A.dot(Ar[j-1], out=Ar[j])
+            for j in range(1, k + 1):
+                A.dot(Ay[j-1], out=Ay[j])
+            t = timer.toc(BASIS, t)
+
+            # 係数計算
+            for j in range(2 * k + 3):
+                jj = j // 2
+                alpha[j] = dot(Ar[jj], Ar[jj + j % 2])
+            for j in range(1, 2 * k + 2):
+                jj = j//2
+                beta[j] = dot(Ay[jj], Ar[jj + j % 2])
+            for j in range(2 * k + 1):
+                jj = j // 2
+                delta[j] = dot(Ay[jj], Ay[jj + j % 2])
+            t = timer.toc(COEFFICIENTS, t)
 
         # MrRでの1反復(解と残差の更新)
         d = alpha[2] * delta[0] - beta[1] ** 2
         zeta = alpha[1] * delta[0] / d
         eta = -alpha[1] * beta[1] / d
+        t = timer.toc(RECURRENCE, t)
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
         Ar[0] -= Ay[0]
-        MultiCpu.dot(local_A, Ar[0], out=Ar[1])
+        t = timer.toc(UPDATE, t)
+        A.dot(Ar[0], out=Ar[1])
+        t = timer.toc(BASIS, t)
         x -= z
+        t = timer.toc(UPDATE, t)
 
         # MrRでのk反復
         for j in range(k):
@@ -101,11 +111,15 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
             d = alpha[2] * delta[0] - beta[1] ** 2
             zeta = alpha[1] * delta[0] / d
             eta = -alpha[1] * beta[1] / d
+            t = timer.toc(RECURRENCE, t)
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
             Ar[0] -= Ay[0]
-            MultiCpu.dot(local_A, Ar[0], out=Ar[1])
+            t = timer.toc(UPDATE, t)
+            A.dot(Ar[0], out=Ar[1])
+            t = timer.toc(BASIS, t)
             x -= z
+            t = timer.toc(UPDATE, t)
 
         i += (k + 1)
         index += 1
@@ -114,13 +128,17 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
         isConverged = False
         residual[index] = norm(Ar[0]) / b_norm
 
-    if rank == 0:
-        elapsed_time = finish(start_time, isConverged, i, residual[index])
-        info = {
-            'time': elapsed_time,
-            'nosl': num_of_solution_updates[:index+1],
-            'residual': residual[:index+1],
-        }
-        return x, info
-    else:
-        exit(0)
+    elapsed_time = finish(start_time, isConverged, i, residual[index], verbose=rank == 0, comm=comm)
+    info = {
+        'time': elapsed_time,
+        'nosl': num_of_solution_updates[:index+1],
+        'residual': residual[:index+1],
+        'threads': A.blas.info(),
+    }
+    A.summarize(info, 'kskipmrr', k)
+
+    # この求解で確保した通信資源を解放する
+    if A is not local_A:
+        A.free()
+
+    return distribute(x, comm, A.local_N, layout), info
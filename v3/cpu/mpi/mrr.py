@@ -2,19 +2,20 @@ import numpy as np
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init, MultiCpu
+from .common import start, finish, init, distribute, MultiCpu
+from ..timer import BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
-def mrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None) -> tuple:
+def mrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None, layout='allgather') -> tuple:
     # MPI初期化
     rank = comm.Get_rank()
-    MultiCpu.joint_mpi(comm)
 
     # 初期化
     T = float64
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(
         b, x, maxiter)
-    MultiCpu.alloc(local_A, T)
+    A = MultiCpu.prepare(comm, local_A, T)
+    timer = A.new_timer()
     Ax = np.zeros(N, T)
     Ar = np.zeros(N, T)
     s = np.zeros(N, T)
@@ -24,14 +25,13 @@ def mrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None
     mu = np.zeros(1, T)
 
     # 初期残差
-    MultiCpu.dot(local_A, x, out=Ax)
+    A.dot(x, out=Ax)
     r = b - Ax
     residual[0] = norm(r) / b_norm
 
     # 初期反復
-    if rank == 0:
-        start_time = start(method_name='MrR + MPI')
-    MultiCpu.dot(local_A, r, out=Ar)
+    start_time = start(method_name='MrR + MPI', verbose=rank == 0)
+    A.dot(r, out=Ar)
     rs = dot(r, Ar)
     ss = dot(Ar, Ar)
     zeta = rs / ss
@@ -46,38 +46,51 @@ def mrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None
     # 反復計算
     while i < maxiter:
         # 収束判定
+        t = timer.tic()
         residual[i] = norm(r) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         isConverged = residual[i] < tol
         if isConverged:
             break
 
         # 解の更新
-        MultiCpu.dot(local_A, r, out=Ar)
+        A.dot(r, out=Ar)
+        t = timer.toc(BASIS, t)
         nu = dot(y, Ar)
         mu = dot(y, y)
+        t = timer.toc(COEFFICIENTS, t)
         gamma = nu / mu
+        t = timer.toc(RECURRENCE, t)
         s = Ar - gamma * y
+        t = timer.toc(UPDATE, t)
         rs = dot(r, s)
         ss = dot(s, s)
+        t = timer.toc(COEFFICIENTS, t)
         zeta = rs / ss
         eta = -zeta * gamma
+        t = timer.toc(RECURRENCE, t)
         y = eta * y + zeta * Ar
         z = eta * z - zeta * r
         r -= y
         x -= z
+        timer.toc(UPDATE, t)
         i += 1
         num_of_solution_updates[i] = i
     else:
         isConverged = False
         residual[i] = norm(r) / b_norm
 
-    if rank == 0:
-        elapsed_time = finish(start_time, isConverged, i, residual[i])
-        info = {
-            'time': elapsed_time,
-            'nosl': num_of_solution_updates[:i+1],
-            'residual': residual[:i+1],
-        }
-        return x, info
-    else:
-        exit(0)
+    elapsed_time = finish(start_time, isConverged, i, residual[i], verbose=rank == 0, comm=comm)
+    info = {
+        'time': elapsed_time,
+        'nosl': num_of_solution_updates[:i+1],
+        'residual': residual[:i+1],
+        'threads': A.blas.info(),
+    }
+    A.summarize(info, 'mrr')
+
+    # この求解で確保した通信資源を解放する
+    if A is not local_A:
+        A.free()
+
+    return distribute(x, comm, A.local_N, layout), info
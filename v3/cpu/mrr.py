@@ -1,21 +1,26 @@
 from numpy import float64, dot
 from numpy.linalg import norm
 
-from .common import start, finish, init
+from .common import start, finish, init, zeros, operator, matvec
+from .timer import Timer, summarize, BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE
 
 
 def mrr(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None) -> tuple:
     # 初期化
+    A = operator(A)
+    timer = Timer()
     x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
 
-    # 初期残差
-    r = b - A.dot(x)
+    # 初期残差(行列ベクトル積の入出力は演算子の作業領域に置く)
+    r = zeros(A, N, float64)
+    r[:] = b - A.dot(x)
+    Ar = zeros(A, N, float64)
     residual[0] = norm(r) / b_norm
 
     # 初期反復
     i = 0
     start_time = start(method_name='MrR')
-    Ar = A.dot(r)
+    matvec(A, r, Ar)
     zeta = dot(r, Ar) / dot(Ar, Ar)
     y = zeta * Ar
     z = -zeta * r
@@ -27,25 +32,34 @@ def mrr(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None)
     # 反復計算
     while i < maxiter:
         # 収束判定
+        t = timer.tic()
         residual[i] = norm(r) / b_norm
+        t = timer.toc(CONVERGENCE, t)
         if residual[i] < tol:
             isConverged = True
             break
 
         # 解の更新
-        Ar = A.dot(r)
+        matvec(A, r, Ar)
+        t = timer.toc(BASIS, t)
         mu = dot(y, y)
         nu = dot(y, Ar)
+        t = timer.toc(COEFFICIENTS, t)
         gamma = nu / mu
+        t = timer.toc(RECURRENCE, t)
         s = Ar - gamma * y
+        t = timer.toc(UPDATE, t)
         rs = dot(r, s)
         ss = dot(s, s)
+        t = timer.toc(COEFFICIENTS, t)
         zeta = rs / ss
         eta = -zeta * gamma
+        t = timer.toc(RECURRENCE, t)
         y = eta * y + zeta * Ar
         z = eta * z - zeta * r
         r -= y
         x -= z
+        timer.toc(UPDATE, t)
         i += 1
         num_of_solution_updates[i] = i
     else:
@@ -58,4 +72,5 @@ def mrr(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None)
         'nosl': num_of_solution_updates[:i+1],
         'residual': residual[:i+1],
     }
+    summarize(info, A, timer, 'mrr')
     return x, info
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse
+
+from .cache import open_arrays
+
+
+class OutOfCore(object):
+    """メモリに載らない行列の行列ベクトル積(out-of-core)
+
+    キャッシュ形式(cache.save)で書き出したCSRをメモリマップで開き, 行ブロックごとにメモリへ読み込んで計算する.
+    次の行ブロックは別スレッドで先読みするので, 読み込みと計算が重なる.
+    メモリ上に置くのは行ポインタと高々2つの行ブロック(buffer_bytes以下)のみ.
+    行列積(xが2次元)では1回の読み込みを全ての列で使い回すので,
+    k-skip系の基底計算は独立な系列をまとめて行列積にする(batched).
+
+    Args:
+        path (str or dict): キャッシュ形式のファイル, または配列(data, indices, indptr, shape)の辞書
+        buffer_bytes (int, optional): 読み込みバッファの合計バイト数(2ブロック分)
+    """
+
+    # 基底計算で独立な系列をまとめて行列積にする
+    batched = True
+
+    def __init__(self, path, buffer_bytes=256 << 20):
+        arrays = open_arrays(path) if isinstance(path, str) else path
+        self.data = arrays['data']
+        self.indices = arrays['indices']
+        self.indptr = np.asarray(arrays['indptr'])
+        self.shape = tuple(int(n) for n in arrays['shape'])
+        self.dtype = self.data.dtype
+        self.nnz = int(self.indptr[-1])
+        self.nbytes = self.indptr.nbytes
+
+        # 1ブロックの非零要素数がバッファの半分に収まるよう行を分ける
+        itemsize = self.data.dtype.itemsize + self.indices.dtype.itemsize
+        block_nnz = max(1, buffer_bytes // 2 // itemsize)
+        offsets = [0]
+        while offsets[-1] < self.shape[0]:
+            begin = offsets[-1]
+            end = int(np.searchsorted(self.indptr, self.indptr[begin] + block_nnz, side='right')) - 1
+            offsets.append(min(self.shape[0], max(end, begin + 1)))
+        self.offsets = np.array(offsets)
+        self.reader = ThreadPoolExecutor(max_workers=1)
+
+    # i番目の行ブロックをメモリへ読み込む
+    def _read(self, i):
+        begin, end = self.offsets[i], self.offsets[i+1]
+        first, last = self.indptr[begin], self.indptr[end]
+        return scipy.sparse.csr_matrix(
+            (np.array(self.data[first:last]), np.array(self.indices[first:last]), self.indptr[begin:end+1] - first),
+            shape=(end - begin, self.shape[1])
+        )
+
+    # 行列ベクトル積(xが2次元なら行列積)
+    def dot(self, x, out=None):
+        if out is None:
+            out = np.empty((self.shape[0],) + x.shape[1:], np.result_type(self.dtype, x.dtype))
+        num_of_block = self.offsets.size - 1
+        future = self.reader.submit(self._read, 0)
+        for i in range(num_of_block):
+            block = future.result()
+            # 計算中に次のブロックを読み込む
+            if i + 1 < num_of_block:
+                future = self.reader.submit(self._read, i + 1)
+            out[self.offsets[i]:self.offsets[i+1]] = block.dot(x)
+        return out
+
+    matvec = dot
+    matmat = dot
+
+    def close(self):
+        self.reader.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
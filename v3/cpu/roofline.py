@@ -0,0 +1,197 @@
+import os
+import time
+
+import numpy as np
+
+from .common import footprint
+
+ITEMSIZE = np.dtype(np.float64).itemsize
+
+# STREAMの実測値に対する割合がこれ以上ならメモリ帯域律速とみなす
+MEMORY_BOUND = 0.5
+# STREAMを測る要素数(キャッシュに収まらない大きさ. 問題の大きさによらず固定)
+STREAM_N = 1 << 22
+
+# ベクトル演算: (要素あたりの浮動小数点演算数, 読み書きするベクトルの数)
+VECTOR = {
+    'dot': (2, 2),      # (x, y)
+    'norm': (2, 1),     # ||x||
+    'axpy': (2, 3),     # y = y + a x
+    'axpby': (3, 3),    # y = a y + b x
+    'sub': (1, 3),      # y = y - x
+    'copy': (0, 2),     # y = x
+}
+# 各演算を数えるフェーズ
+PHASE = {
+    'spmv': 'basis', 'dot': 'coefficients', 'scalar': 'recurrence', 'norm': 'convergence',
+    'axpy': 'update', 'axpby': 'update', 'sub': 'update', 'copy': 'update',
+}
+
+_reference = None
+
+
+def enabled() -> bool:
+    return os.environ.get('KRYLOV_ROOFLINE', '0') == '1'
+
+
+def kernels(method, k=0) -> dict:
+    """1外部反復(k-skip系はk+1回の解の更新)で呼ぶ演算の回数
+
+    Args:
+        method (str): 'cg', 'mrr', 'kskipcg', 'kskipmrr', 'adaptivekskipmrr'
+        k (int, optional): k
+
+    Returns:
+        dict: {演算: 回数}. 'scalar' はスカラー漸化式の浮動小数点演算数
+    """
+    if method == 'cg':
+        return {'spmv': 1, 'dot': 2, 'norm': 1, 'axpy': 3, 'scalar': 4}
+    if method == 'mrr':
+        return {'spmv': 1, 'dot': 4, 'norm': 1, 'axpy': 1, 'axpby': 2, 'sub': 2, 'scalar': 6}
+    if method == 'kskipcg':
+        # 漸化式は1項あたり13演算
+        scalar = sum(13 * (2 * (k - j) + 1) for j in range(k)) + 5 * (k + 1)
+        return {'spmv': 3 * k + 2, 'dot': 6 * k + 7, 'norm': 1, 'axpy': 3 * (k + 1), 'scalar': scalar}
+    if method in ('kskipmrr', 'adaptivekskipmrr'):
+        # 漸化式は1項あたり12演算
+        scalar = sum(12 * (2 * (k - j) - 1) + 15 for j in range(k)) + 8 * (k + 1)
+        counts = {'spmv': 3 * k + 2, 'dot': 6 * k + 5, 'norm': 1, 'axpby': 2 * (k + 1), 'sub': 2 * (k + 1), 'scalar': scalar}
+        if method == 'adaptivekskipmrr':
+            # 直前の解の保存
+            counts['copy'] = 1
+        return counts
+    raise ValueError(f'unknown method: { method }')
+
+
+def count(method, A, iterations, N=None, k=0) -> dict:
+    """浮動小数点演算数と必須のメモリ転送量(行列は毎回読み, ベクトルは演算ごとに読み書きする)
+
+    Args:
+        method (str): 解法
+        A: 演算子(MPIでは自ランクの行ブロック)
+        iterations (int or list): 外部反復の回数. adaptivekskipmrrは反復ごとのkの一覧
+        N (int, optional): ベクトルの長さ. Noneなら行数
+        k (int, optional): k
+
+    Returns:
+        dict: {フェーズ: {'flops', 'bytes'}}
+    """
+    rows = A.shape[0]
+    N = rows if N is None else N
+    if isinstance(iterations, int):
+        totals = {name: value * iterations for name, value in kernels(method, k).items()}
+    else:
+        totals = {}
+        for kk in iterations:
+            for name, value in kernels(method, int(kk)).items():
+                totals[name] = totals.get(name, 0) + value
+
+    # 行列ベクトル積: 行列 + 入力ベクトル全体 + 出力(自分の行)
+    spmv_bytes = footprint(A) + (N + rows) * ITEMSIZE
+    phases = {}
+    for name, times in totals.items():
+        if name == 'spmv':
+            flops, nbytes = 2 * getattr(A, 'nnz', 0) * times, spmv_bytes * times
+        elif name == 'scalar':
+            flops, nbytes = times, 0
+        else:
+            per_element, vectors = VECTOR[name]
+            flops, nbytes = per_element * N * times, vectors * N * ITEMSIZE * times
+        phase = phases.setdefault(PHASE[name], {'flops': 0, 'bytes': 0})
+        phase['flops'] += flops
+        phase['bytes'] += nbytes
+    return phases
+
+
+# 最小の実行時間
+def _elapsed(task, repeat) -> float:
+    task()
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        task()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def stream(N, repeat=10) -> dict:
+    """STREAM相当の参照値(GB/s)
+
+    copy, scale, add, triad をnumpyで計測する. バイト数はSTREAMと同じ数え方
+    (triadは一時配列を使わないよう2回に分けるので, 実際の転送量はこれより多い).
+
+    Args:
+        N (int): 配列の要素数
+        repeat (int, optional): 繰り返し回数(最小値を使う)
+
+    Returns:
+        dict: 各カーネルの帯域幅(GB/s)
+    """
+    a, b, c = np.ones(N), np.full(N, 2.0), np.zeros(N)
+    scalar = 3.0
+
+    def triad():
+        np.multiply(c, scalar, out=a)
+        a.__iadd__(b)
+    kernels = {
+        'copy': (lambda: np.copyto(c, a), 2),
+        'scale': (lambda: np.multiply(c, scalar, out=b), 2),
+        'add': (lambda: np.add(a, b, out=c), 3),
+        'triad': (triad, 3),
+    }
+    return {name: count * N * ITEMSIZE / _elapsed(task, repeat) / 1e9 for name, (task, count) in kernels.items()}
+
+
+# STREAMの実測値(GB/s, 4カーネルの最大). プロセスごとにSTREAM_Nで1度だけ測る
+# 内積など書き込みの無い演算はtriadより速いので最大値を基準にする
+def reference() -> float:
+    global _reference
+    if _reference is None:
+        _reference = max(stream(STREAM_N).values())
+    return _reference
+
+
+def analyse(method, info, timings, A, N=None, k=0, bandwidth=None) -> dict:
+    """演算数・転送量と計測時間から, 達成した GFLOP/s と GB/s, STREAMに対する割合を求める
+
+    全体がSTREAMのMEMORY_BOUND以上の帯域を出していれば 'memory-bound'
+    (ベクトル・行列がキャッシュに収まる大きさでは割合が1を超える),
+    そうでなければ呼び出し・同期などの固定時間が支配的な 'latency-bound' とする.
+    latency-boundならkを大きくして同期の回数を減らすと速くなる余地がある
+    (memory-boundでは行列ベクトル積の回数が増えるだけ).
+
+    Args:
+        method (str): 解法
+        info (dict): 求解関数のinfo('time', 'nosl', adaptivekskipmrrは'khistory')
+        timings (dict): このプロセスのフェーズ時間(Timer.summary)
+        A: 演算子
+        N (int, optional): ベクトルの長さ. Noneなら行数
+        k (int, optional): k
+        bandwidth (float, optional): STREAMの帯域(GB/s). Noneなら測る
+
+    Returns:
+        dict: 全体と 'phases'(フェーズごと)の 'flops', 'bytes', 'gflops', 'bandwidth', 'stream_fraction',
+            および 'intensity'(flops/byte), 'stream', 'bound', 'larger_k'
+    """
+    if bandwidth is None:
+        bandwidth = reference()
+    outer = len(info['nosl']) - 1
+    iterations = info['khistory'][1:outer+1] if method == 'adaptivekskipmrr' else outer
+    phases = count(method, A, iterations, N, k)
+
+    def rates(flops, nbytes, seconds):
+        achieved = nbytes / seconds / 1e9 if seconds > 0 else 0.0
+        return {
+            'flops': flops, 'bytes': nbytes,
+            'gflops': flops / seconds / 1e9 if seconds > 0 else 0.0,
+            'bandwidth': achieved,
+            'stream_fraction': achieved / bandwidth,
+        }
+
+    summary = rates(sum(p['flops'] for p in phases.values()), sum(p['bytes'] for p in phases.values()), info['time'])
+    summary['phases'] = {name: rates(p['flops'], p['bytes'], timings.get(name, 0.0)) for name, p in phases.items()}
+    summary['intensity'] = summary['flops'] / summary['bytes'] if summary['bytes'] else 0.0
+    summary['stream'] = bandwidth
+    summary['bound'] = 'memory-bound' if summary['stream_fraction'] >= MEMORY_BOUND else 'latency-bound'
+    summary['larger_k'] = summary['bound'] == 'latency-bound'
+    return summary
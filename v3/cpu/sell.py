@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+import scipy.sparse
+
+from .kernels import jit, prange, payoff, report
+
+
+def _spmv(chunk_ptr, widths, cols, data, perm, x, y, C):
+    n = perm.size
+    for c in prange(widths.size):
+        # C本のレーンを同時に進める(内側のループがSIMD化される)
+        acc = np.zeros(C, y.dtype)
+        base = chunk_ptr[c]
+        for j in range(widths[c]):
+            offset = base + j * C
+            for l in range(C):
+                acc[l] += data[offset + l] * x[cols[offset + l]]
+        for l in range(min(C, n - c * C)):
+            y[perm[c * C + l]] = acc[l]
+
+
+def _spmm(chunk_ptr, widths, cols, data, perm, x, y, C):
+    n = perm.size
+    m = x.shape[1]
+    for c in prange(widths.size):
+        acc = np.zeros((C, m), y.dtype)
+        base = chunk_ptr[c]
+        for j in range(widths[c]):
+            offset = base + j * C
+            for l in range(C):
+                value = data[offset + l]
+                col = cols[offset + l]
+                for t in range(m):
+                    acc[l, t] += value * x[col, t]
+        for l in range(min(C, n - c * C)):
+            y[perm[c * C + l]] = acc[l]
+
+
+_spmv_compiled = jit(_spmv)
+_spmm_compiled = jit(_spmm)
+
+
+class SellCsr(object):
+    """SELL-C-σ形式(スライス化ELLPACK)の行列
+
+    σ行ごとの窓の中で行を非零要素数の降順に並べ替え, C行ずつのチャンクに分ける.
+    各チャンクはそのチャンク内の最長行の長さまで詰め物をし, 列優先(C行が連続)で格納する.
+    numbaがあればコンパイルしたカーネルで, 無ければnumpyで計算する.
+    v3/cpuの求解関数には行列の代わりにそのまま渡せる.
+
+    Args:
+        A (scipy.sparse matrix or numpy.ndarray): 係数行列
+        C (int, optional): チャンクの行数(SIMDのレーン数の倍数にする)
+        sigma (int, optional): 並べ替えの窓の行数. 1なら並べ替えない
+        verbose (bool, optional): Trueなら変換時間とCSRに対する速度を計測して表示する
+    """
+
+    def __init__(self, A, C=8, sigma=256, verbose=False):
+        start_time = time.perf_counter()
+        A = scipy.sparse.csr_matrix(A)
+        A.sum_duplicates()
+        n = A.shape[0]
+        self.shape = A.shape
+        self.dtype = A.dtype
+        self.nnz = A.nnz
+        self.C = C
+        self.sigma = max(1, sigma)
+
+        # σ行の窓ごとに長い行から並べる
+        lengths = np.diff(A.indptr)
+        window = np.arange(n) // self.sigma
+        self.perm = np.lexsort((-lengths, window)).astype(np.int32)
+        sorted_lengths = lengths[self.perm]
+
+        # チャンクごとの幅と先頭位置
+        num_of_chunk = -(-n // C)
+        padded = np.zeros(num_of_chunk * C, lengths.dtype)
+        padded[:n] = sorted_lengths
+        self.widths = padded.reshape(num_of_chunk, C).max(axis=1).astype(np.int32)
+        self.chunk_ptr = np.zeros(num_of_chunk + 1, np.int64)
+        np.cumsum(self.widths.astype(np.int64) * C, out=self.chunk_ptr[1:])
+
+        # 要素の格納位置: チャンク先頭 + 行内の番号 * C + レーン
+        P = A[self.perm]
+        row = np.repeat(np.arange(n), sorted_lengths)
+        j = np.arange(P.nnz) - np.repeat(P.indptr[:-1], sorted_lengths)
+        position = self.chunk_ptr[row // C] + j * C + row % C
+        size = int(self.chunk_ptr[-1])
+        self.data = np.zeros(size, self.dtype)
+        self.cols = np.zeros(size, np.int32)
+        self.data[position] = P.data
+        self.cols[position] = P.indices
+        if _spmv_compiled is None:
+            # numpy用: 格納位置ごとの(並べ替え後の)行番号
+            self.lanes = np.zeros(size, np.int32)
+            self.lanes[position] = row
+
+        self.fill = size / max(1, self.nnz)
+        self.nbytes = self.data.nbytes + self.cols.nbytes + self.chunk_ptr.nbytes + self.widths.nbytes + self.perm.nbytes
+        self.cost = {'convert_time': time.perf_counter() - start_time, 'fill': self.fill}
+        if verbose:
+            self.cost.update(payoff(A, self, self.cost['convert_time']))
+            report(f'SELL-{ C }-{ self.sigma }', self.cost)
+
+    # 行列ベクトル積(xが2次元なら行列積)
+    def dot(self, x, out=None):
+        x = np.ascontiguousarray(x)
+        shape = (self.shape[0],) + x.shape[1:]
+        T = np.result_type(self.dtype, x.dtype)
+        y = out if out is not None and out.flags.c_contiguous and out.dtype == T else np.empty(shape, T)
+        args = (self.chunk_ptr, self.widths, self.cols, self.data, self.perm, x, y, self.C)
+        if _spmv_compiled is not None:
+            (_spmv_compiled if x.ndim == 1 else _spmm_compiled)(*args)
+        else:
+            self._dot_numpy(x, y)
+        if out is not None and y is not out:
+            out[...] = y
+            return out
+        return y
+
+    matvec = dot
+    matmat = dot
+
+    def _dot_numpy(self, x, y):
+        n = self.shape[0]
+        gathered = x[self.cols]
+        if x.ndim == 1:
+            y[self.perm] = np.bincount(self.lanes, self.data * gathered, minlength=n)
+            return
+        for t in range(x.shape[1]):
+            y[self.perm, t] = np.bincount(self.lanes, self.data * gathered[:, t], minlength=n)
@@ -0,0 +1,233 @@
+import importlib
+import os
+import threading
+from collections import OrderedDict
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+import scipy.sparse
+
+from .common import footprint, operator
+
+
+def _load(path):
+    from .cache import read
+    return read(path)
+
+
+class SolverService(object):
+    """行列を常駐させたまま求解要求を受け付けるサービス
+
+    ローカルソケット(multiprocessing.connection)で右辺ベクトルを受け取り,
+    v3の求解関数で解いて解とinfoを返す.
+    用意済みの演算子はmemory_limitを超えると最も長く使われていないものから破棄する.
+    commを渡すとrank 0が要求を受け付け, 全ランクで分割した行列を常駐させて解く.
+    このとき演算子の大きさは全ランクの合計で数えるので, 破棄の判断は全ランクで一致する.
+    要求はpickleで受け取るので, 認証キーを知るクライアントだけが接続できる.
+
+    Args:
+        address (tuple or str, optional): 待ち受けアドレス
+        authkey (bytes, optional): 認証キー. Noneならランダムに生成する(service.authkey)
+        memory_limit (int, optional): 常駐させる演算子の合計バイト数の上限(MPIでは全ランクの合計)
+        comm (optional): MPIコミュニケータ
+    """
+
+    def __init__(self, address=('localhost', 0), authkey=None, memory_limit=None, comm=None):
+        self.address = address
+        self.authkey = os.urandom(32) if authkey is None else authkey
+        self.memory_limit = memory_limit
+        self.comm = comm
+        self.rank = comm.Get_rank() if comm is not None else 0
+        self.operators = OrderedDict()
+        self.nbytes = OrderedDict()
+        self.listener = None
+        self.ready = threading.Event()
+
+    # 演算子の準備
+    def register(self, name, A):
+        if name in self.operators:
+            self.evict(name)
+        if self.comm is not None:
+            from .mpi.common import MultiCpu
+            size = self.comm.Get_size()
+            local_N = A.shape[0] // size
+            begin = self.rank * local_N
+            A = MultiCpu(self.comm, A[begin:begin+local_N])
+        else:
+            # 添字の圧縮・DIA変換などを登録時に1度だけ行う
+            A = operator(A)
+        self.operators[name] = A
+        self.nbytes[name] = footprint(A) if self.comm is None else self.comm.allreduce(footprint(A))
+        self._shrink(name)
+        return self.nbytes[name]
+
+    def load(self, name, path):
+        return self.register(name, _load(path))
+
+    def evict(self, name):
+        A = self.operators.pop(name)
+        self.nbytes.pop(name)
+        if hasattr(A, 'free'):
+            A.free()
+
+    # LRUで上限まで破棄する(直前に登録したものは残す)
+    def _shrink(self, keep):
+        if self.memory_limit is None:
+            return
+        while sum(self.nbytes.values()) > self.memory_limit and len(self.operators) > 1:
+            name = next(iter(self.operators))
+            if name == keep:
+                self.operators.move_to_end(name)
+                continue
+            self.evict(name)
+
+    def solve(self, name, b, method='cg', **kwargs):
+        A = self.operators[name]
+        self.operators.move_to_end(name)
+        self.nbytes.move_to_end(name)
+        if self.comm is not None:
+            module = importlib.import_module(f'.mpi.{method}', __package__)
+            return getattr(module, method)(self.comm, A, b, **kwargs)
+        module = importlib.import_module(f'.{method}', __package__)
+        return getattr(module, method)(A, b, **kwargs)
+
+    def status(self):
+        return {name: nbytes for name, nbytes in self.nbytes.items()}
+
+    # 要求の処理
+    def handle(self, request):
+        command, args, kwargs = request
+        if command not in ('register', 'load', 'evict', 'solve', 'status'):
+            raise ValueError(f'unknown command: { command }')
+        return getattr(self, command)(*args, **kwargs)
+
+    # 要求を処理して (状態, 値) を返す. MPIでは全ランクの例外をrank 0に集める
+    def _reply(self, request):
+        try:
+            reply = ('ok', self.handle(request))
+        except Exception as e:
+            reply = ('error', f'{ type(e).__name__ }: { e }')
+        if self.comm is not None:
+            errors = self.comm.gather(reply[1] if reply[0] == 'error' else None, root=0)
+            if self.rank == 0 and any(error is not None for error in errors):
+                reply = ('error', '; '.join(f'rank { rank }: { error }' for rank, error in enumerate(errors) if error is not None))
+        return reply
+
+    def serve_forever(self):
+        # rank 0以外はrank 0から配られる要求を処理する
+        if self.rank != 0:
+            while True:
+                request = self.comm.bcast(None, root=0)
+                if request is None:
+                    return
+                self._reply(request)
+
+        with Listener(self.address, authkey=self.authkey) as listener:
+            self.listener = listener
+            self.address = listener.address
+            self.ready.set()
+            running = True
+            while running:
+                with listener.accept() as conn:
+                    running = self._serve(conn)
+        if self.comm is not None:
+            self.comm.bcast(None, root=0)
+
+    # 1接続分の要求を処理する. shutdownを受け取るとFalseを返す
+    def _serve(self, conn):
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                return True
+            if request[0] == 'shutdown':
+                conn.send(('ok', None))
+                return False
+            if self.comm is not None:
+                self.comm.bcast(request, root=0)
+            conn.send(self._reply(request))
+
+
+class SolverClient(object):
+    """SolverServiceのクライアント
+
+    Args:
+        address (tuple or str): SolverServiceの待ち受けアドレス
+        authkey (bytes): SolverServiceの認証キー(service.authkey)
+    """
+
+    def __init__(self, address, authkey):
+        self.conn = Client(address, authkey=authkey)
+
+    def _request(self, command, *args, **kwargs):
+        self.conn.send((command, args, kwargs))
+        state, payload = self.conn.recv()
+        if state == 'error':
+            raise RuntimeError(payload)
+        return payload
+
+    def register(self, name, A):
+        return self._request('register', name, A)
+
+    def load(self, name, path):
+        return self._request('load', name, path)
+
+    def evict(self, name):
+        return self._request('evict', name)
+
+    def solve(self, name, b, method='cg', **kwargs):
+        return self._request('solve', name, b, method=method, **kwargs)
+
+    def status(self):
+        return self._request('status')
+
+    def shutdown(self):
+        self.conn.send(('shutdown', (), {}))
+        self.conn.recv()
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        if not self.conn.closed:
+            self.close()
+
+
+# ループバック動作確認: 同一プロセス内でサービスを起動し, 2つの行列を切り替えて解く
+def loopback(n=32, method='cg', num_of_solves=4, **kwargs) -> bool:
+    from scipy.sparse import diags, kronsum
+
+    T = diags([-1, 2, -1], [-1, 0, 1], shape=(n, n), format='csr')
+    matrices = {
+        'poisson': kronsum(T, T, format='csr'),
+        'shifted': (kronsum(T, T) + 0.5 * scipy.sparse.identity(n * n)).tocsr(),
+    }
+    # 上限を1行列分にしてLRU破棄も確認する
+    limit = max(footprint(A) for A in matrices.values())
+    service = SolverService(memory_limit=limit)
+    thread = threading.Thread(target=service.serve_forever, daemon=True)
+    thread.start()
+    service.ready.wait()
+
+    isPassed = True
+    with SolverClient(service.address, service.authkey) as client:
+        for i in range(num_of_solves):
+            name = list(matrices)[i % len(matrices)]
+            A = matrices[name]
+            if name not in client.status():
+                client.register(name, A)
+            b = np.random.default_rng(i).random(A.shape[0])
+            x, info = client.solve(name, b, method=method, tol=1e-10, **kwargs)
+            isPassed &= np.linalg.norm(b - A.dot(x)) / np.linalg.norm(b) < 1e-8
+            isPassed &= len(client.status()) == 1
+        client.shutdown()
+    thread.join()
+    return bool(isPassed)
+
+
+if __name__ == '__main__':
+    print('loopback:', 'passed' if loopback() else 'failed')
@@ -0,0 +1,299 @@
+import os
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+import scipy.sparse
+
+from .common import rows, balance, cores, pin, touch, compress
+
+# 制御コマンド
+DOT = 1
+EXIT = 2
+ATTACH = 3
+# 制御領域: [コマンド, 入力の領域番号, 入力の位置, 出力の領域番号, 出力の位置]
+CTRL_SIZE = 5
+# 領域番号 0: 入力ベクトル, 1: 出力ベクトル, 2以降: zerosで確保した作業領域
+X = 0
+Y = 1
+
+
+def _share(array, fill=True):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, array.dtype, buffer=shm.buf)
+    if fill:
+        shared[...] = array
+    return shm, shared
+
+
+def _attach(name, shape, dtype):
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.12以前 (資源の追跡は作成元と共有される)
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+# 共有メモリ上の配列から行ブロック[begin, end)を組み立てる
+def _block(arrays, begin, end, N):
+    if 'dense' in arrays:
+        return arrays['dense'][begin:end]
+    A = scipy.sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=(arrays['indptr'].size - 1, N))
+    return rows(A, begin, end)
+
+
+# ワーカープロセス: 共有メモリはプロセス終了時に手放す
+def _worker(specs, segments, ctrl_name, conn, barrier, begin, end, N, T, core):
+    # NUMA: コアに固定し, 担当行の行列要素・ベクトルを自分で書き込む
+    numa = core is not None
+    pin(core)
+    shms = []
+    arrays = {}
+    for key, (name, shape, dtype) in specs.items():
+        shm, arrays[key] = _attach(name, shape, dtype)
+        shms.append(shm)
+    if numa:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            key, first, values = message
+            arrays[key].reshape(-1)[first:first+values.size] = values.reshape(-1)
+    block = _block(arrays, begin, end, N)
+    shm, ctrl = _attach(ctrl_name, (CTRL_SIZE,), np.int64)
+    shms.append(shm)
+    vectors = []
+
+    def attach(name, size):
+        shm, vector = _attach(name, (size,), T)
+        shms.append(shm)
+        vectors.append(vector)
+        if numa and size % N == 0:
+            touch(vector, N, begin, end)
+
+    for name, size in segments:
+        attach(name, size)
+    barrier.wait()
+
+    while True:
+        barrier.wait()
+        command, x_seg, x_pos, y_seg, y_pos = ctrl
+        if command == EXIT:
+            break
+        if command == ATTACH:
+            # 新しく確保された作業領域を参照する(NUMAでは担当行を書き込む)
+            attach(*conn.recv())
+        else:
+            x = vectors[x_seg][x_pos:x_pos+N]
+            vectors[y_seg][y_pos+begin:y_pos+end] = block.dot(x)
+        barrier.wait()
+
+
+class SharedCpu(object):
+    """共有メモリを用いた単一ノード・複数プロセスの行列ベクトル積
+
+    各ワーカープロセスが非零要素数で均等にした行ブロックを受け持つ.
+    行列・入出力ベクトル・zerosで確保した作業領域は共有メモリ上に置き,
+    同期はバリアのみで行う. MPIは不要.
+    zerosで確保したベクトルを入力・出力に渡すとベクトルのコピーは発生しない.
+
+    Args:
+        A (numpy.ndarray or scipy.sparse.csr_matrix): 係数行列
+        num_of_process (int, optional): プロセス数(呼び出し元を含む). Noneなら全コア
+        T (optional): 精度
+        numa (bool, optional): Trueなら各ワーカーをコアに固定し,
+            担当行の行列要素とベクトルを各ワーカーが最初に書き込む(ファーストタッチ)
+    """
+
+    def __init__(self, A, num_of_process=None, T=np.float64, numa=False):
+        if num_of_process is None:
+            num_of_process = os.cpu_count()
+        self.num_of_process = max(1, num_of_process)
+        self.T = T
+        self.shape = A.shape
+        self.dtype = np.dtype(T)
+        self.N = A.shape[0]
+        self.numa = numa
+        self.shms = []
+
+        # 行列を共有メモリへ置く
+        if isinstance(A, np.ndarray):
+            A = np.ascontiguousarray(A, T)
+            arrays = {'dense': A}
+            self.nnz = A.size
+        else:
+            A = compress(scipy.sparse.csr_matrix(A, dtype=T))
+            arrays = {'data': A.data, 'indices': A.indices, 'indptr': A.indptr}
+            self.nnz = A.nnz
+        # 非零要素数で均等になるよう行を分割する
+        self.offsets = balance(A, self.num_of_process)
+        specs = {}
+        self.arrays = {}
+        for key, array in arrays.items():
+            # NUMA: 行ポインタ以外は各ワーカーが担当部分を書き込む
+            shm, self.arrays[key] = _share(array, fill=not numa or key == 'indptr')
+            self.shms.append(shm)
+            specs[key] = (shm.name, array.shape, array.dtype)
+        if numa:
+            for key, first, last in self._parts(A, 0):
+                self.arrays[key].reshape(-1)[first:last] = arrays[key].reshape(-1)[first:last]
+
+        # 制御領域と入出力ベクトル
+        ctrl_shm, self.ctrl = _share(np.zeros(CTRL_SIZE, np.int64))
+        self.shms.append(ctrl_shm)
+        self.segments = []
+        self.vectors = []
+        for _ in (X, Y):
+            self._segment(self.N)
+        self.block = _block(self.arrays, self.offsets[0], self.offsets[1], self.shape[1])
+
+        # ワーカー起動(先頭ブロックは呼び出し元が計算する)
+        core_list = cores()
+        self.barrier = mp.Barrier(self.num_of_process)
+        self.conns = []
+        self.workers = []
+        for i in range(1, self.num_of_process):
+            conn, child = mp.Pipe()
+            core = core_list[i % len(core_list)] if numa else None
+            worker = mp.Process(
+                target=_worker,
+                args=(specs, list(self.segments), ctrl_shm.name, child, self.barrier,
+                      self.offsets[i], self.offsets[i+1], self.shape[1], self.T, core),
+                daemon=True
+            )
+            worker.start()
+            if numa:
+                for key, first, last in self._parts(A, i):
+                    conn.send((key, first, arrays[key].reshape(-1)[first:last]))
+                conn.send(None)
+            self.conns.append(conn)
+            self.workers.append(worker)
+        if self.workers:
+            self.barrier.wait()
+
+    # i番目のブロックが担当する行列要素の範囲
+    def _parts(self, A, i):
+        begin, end = self.offsets[i], self.offsets[i+1]
+        if isinstance(A, np.ndarray):
+            return [('dense', begin * A.shape[1], end * A.shape[1])]
+        first, last = A.indptr[begin], A.indptr[end]
+        return [('data', first, last), ('indices', first, last)]
+
+    # 共有メモリ上にベクトルを確保する. ワーカーの参照(NUMAでは担当行の書き込み)が終わってから返す
+    def _segment(self, size):
+        shm = shared_memory.SharedMemory(create=True, size=max(size * self.dtype.itemsize, 1))
+        vector = np.ndarray((size,), self.T, buffer=shm.buf)
+        self.shms.append(shm)
+        self.segments.append((shm.name, size))
+        self.vectors.append(vector)
+        workers = getattr(self, 'workers', [])
+        if workers:
+            for conn in self.conns:
+                conn.send((shm.name, size))
+            self.ctrl[0] = ATTACH
+            self.barrier.wait()
+        if self.numa and size % self.N == 0:
+            # 新しい共有メモリは0で埋められているので担当行のみ書き込む
+            touch(vector, self.N, self.offsets[0], self.offsets[1])
+        else:
+            vector[:] = 0
+        if workers:
+            self.barrier.wait()
+        return vector
+
+    # 共有メモリ上に作業領域を確保する
+    def zeros(self, shape, T=None):
+        size = int(np.prod(shape))
+        return self._segment(size).reshape(shape)
+
+    # ベクトルが共有メモリ上にあればその(領域番号, 位置)を返す
+    def _locate(self, v):
+        if v.dtype != self.dtype or not v.flags.c_contiguous:
+            return None
+        address = v.__array_interface__['data'][0]
+        for seg, vector in enumerate(self.vectors):
+            base = vector.__array_interface__['data'][0]
+            pos, rem = divmod(address - base, self.dtype.itemsize)
+            if rem == 0 and 0 <= pos and pos + v.size <= vector.size:
+                return seg, pos
+        return None
+
+    # 行列ベクトル積. outを省略した場合は共有の出力ベクトルを返す(次の呼び出しで上書きされる)
+    def dot(self, x, out=None):
+        source = self._locate(x)
+        if source is None:
+            self.vectors[X][:] = x
+            source = (X, 0)
+        target = self._locate(out) if out is not None else (Y, 0)
+        if target is None:
+            target = (Y, 0)
+        # 入力と出力が重なる場合は入力をコピーする
+        if source[0] == target[0] and abs(source[1] - target[1]) < self.N:
+            self.vectors[X][:] = self.vectors[source[0]][source[1]:source[1]+self.N]
+            source = (X, 0)
+
+        self.ctrl[:] = (DOT, *source, *target)
+        if self.workers:
+            self.barrier.wait()
+        x_seg, x_pos = source
+        y_seg, y_pos = target
+        begin, end = self.offsets[0], self.offsets[1]
+        self.vectors[y_seg][y_pos+begin:y_pos+end] = self.block.dot(self.vectors[x_seg][x_pos:x_pos+self.N])
+        if self.workers:
+            self.barrier.wait()
+
+        y = self.vectors[y_seg][y_pos:y_pos+self.N]
+        if out is None:
+            return y
+        if target == (Y, 0):
+            out[:] = y
+        return out
+
+    # ワーカーを終了し共有メモリを解放する
+    def close(self):
+        if self.workers:
+            self.ctrl[0] = EXIT
+            self.barrier.wait()
+            for worker in self.workers:
+                worker.join()
+        self.workers = []
+        self.conns = []
+        self.block = None
+        self.arrays = {}
+        self.vectors = []
+        self.ctrl = None
+        for shm in self.shms:
+            try:
+                shm.close()
+            except BufferError:
+                # zerosで渡した配列がまだ参照されている
+                pass
+            shm.unlink()
+        self.shms = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+# 動作確認: zerosで確保した領域へ最初の積より前に書き込み, 積がscipyと一致するか調べる
+def check(n=64, num_of_process=4, numa=True) -> bool:
+    from scipy.sparse import diags, kronsum
+
+    T = diags([-1, 2, -1], [-1, 0, 1], shape=(n, n), format='csr')
+    A = kronsum(T, T, format='csr')
+    x = np.random.default_rng(0).random(A.shape[0])
+    with SharedCpu(A, num_of_process, numa=numa) as S:
+        V = S.zeros((2, A.shape[0]))
+        V[0] = x
+        S.dot(V[0], out=V[1])
+        error = np.abs(V[1] - A.dot(x)).max()
+        del V
+    return bool(error < 1e-12)
+
+
+if __name__ == '__main__':
+    print('check:', 'passed' if check() and check(numa=False) else 'failed')
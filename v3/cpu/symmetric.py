@@ -0,0 +1,84 @@
+import numpy as np
+import scipy.sparse
+
+from .common import compress
+from .threads import ThreadCpu
+
+
+class SymmetricCsr(object):
+    """対称行列の半分格納(対角 + 狭義上三角のCSR)
+
+    行列ベクトル積では非対角要素を2回(上三角はそのまま, 下三角は転置として)使う.
+    Aが対称行列の行ブロック A[begin:begin+n] の場合は, 全体の上三角のうちその行に属する部分を持つ.
+    (分散時は MultiCpu が転置側の寄与を集約する)
+
+    Args:
+        A (scipy.sparse matrix or numpy.ndarray): 対称な係数行列, またはその行ブロック
+        begin (int, optional): 行ブロックの先頭行
+        num_of_thread (int, optional): 指定するとスレッド並列で計算する
+    """
+
+    def __init__(self, A, begin=0, num_of_thread=None):
+        A = compress(scipy.sparse.csr_matrix(A))
+        n, N = A.shape
+        self.begin = begin
+        self.shape = A.shape
+        self.dtype = A.dtype
+        # 対角要素
+        self.diagonal = np.asarray(A[:, begin:begin+n].diagonal(), self.dtype)
+        # 狭義上三角(全体の列番号 > 全体の行番号)
+        self.upper = compress(scipy.sparse.triu(A, k=begin+1, format='csr'))
+        self.upper.sort_indices()
+        self.nnz = 2 * self.upper.nnz + np.count_nonzero(self.diagonal)
+        self.nbytes = self.upper.data.nbytes + self.upper.indices.nbytes + self.upper.indptr.nbytes + self.diagonal.nbytes
+
+        # スレッド並列: 転置側は各スレッド専用のバッファへ書き込み, 後で行ごとに足し合わせる
+        self.engine = None
+        if num_of_thread is not None and num_of_thread > 1 and begin == 0 and n == N:
+            self.engine = ThreadCpu(self.upper, num_of_thread, min_chunk=1)
+            self.buffers = np.zeros((self.engine.num_of_thread, N), self.dtype)
+
+    # 自分の行の寄与(対角 + 上三角)
+    def dot_upper(self, x):
+        n = self.shape[0]
+        return self.diagonal * x[self.begin:self.begin+n] + self.upper.dot(x)
+
+    # 転置側の寄与(長さN). x_local は自分の行に対応するxの区間
+    def dot_lower(self, x_local):
+        return self.upper.T.dot(x_local)
+
+    def dot(self, x, out=None):
+        if self.shape[0] != self.shape[1]:
+            raise ValueError('dot of a row block needs the other blocks; use MultiCpu')
+        if self.engine is not None:
+            return self._dot_threads(x, out)
+        y = self.dot_upper(x) + self.dot_lower(x)
+        if out is None:
+            return y
+        out[...] = y
+        return out
+
+    matvec = dot
+
+    def _dot_threads(self, x, out):
+        if out is None:
+            out = np.empty(self.shape[0], np.result_type(self.dtype, x.dtype))
+        engine = self.engine
+        buffers = self.buffers
+
+        # 自分の行は直接, 転置側は専用バッファへ(上三角なので担当行以降の列のみ)
+        def scatter(i, begin, end):
+            block = engine.blocks[i]
+            out[begin:end] = self.diagonal[begin:end] * x[begin:end] + block.dot(x)
+            buffers[i, begin:] = block.T.dot(x[begin:end])[begin:]
+
+        # 行ごとに足し合わせる(担当行へ書き込むのはそれ以前のスレッドのみ)
+        def reduce(i, begin, end):
+            out[begin:end] += buffers[:i+1, begin:end].sum(axis=0)
+        engine.run(scatter)
+        engine.run(reduce)
+        return out
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.close()
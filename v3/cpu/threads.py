@@ -0,0 +1,137 @@
+import os
+import threading
+
+import numpy as np
+import scipy.sparse
+
+from .common import rows, balance, cores, pin, touch, compress
+
+
+class ThreadCpu(object):
+    """スレッドを用いた行列ベクトル積・ベクトル演算
+
+    CSRの行を非零要素数で均等にしたチャンクに分け, 常駐するスレッドで計算する.
+    i番目のスレッドは常にi番目のチャンク(行列の行とベクトルの同じ区間)を受け持つ.
+    各チャンクの計算(scipyのSpMV, BLAS, numpyのufunc)はGILを解放するので並列に動く.
+    v3/cpuの求解関数には行列の代わりにそのまま渡せる.
+
+    Args:
+        A (numpy.ndarray or scipy.sparse.csr_matrix): 係数行列
+        num_of_thread (int, optional): スレッド数. Noneなら全コア
+        min_chunk (int, optional): 1チャンクあたり最小行数
+        numa (bool, optional): Trueなら各スレッドをコアに固定し,
+            担当行の行列要素とzerosで確保したベクトルを各スレッドが最初に書き込む(ファーストタッチ)
+    """
+
+    def __init__(self, A, num_of_thread=None, min_chunk=16384, numa=False):
+        if num_of_thread is None:
+            num_of_thread = os.cpu_count()
+        if not isinstance(A, np.ndarray):
+            A = compress(scipy.sparse.csr_matrix(A))
+        self.shape = A.shape
+        self.dtype = A.dtype
+        self.nnz = A.size if isinstance(A, np.ndarray) else A.nnz
+        self.numa = numa
+        N = self.shape[0]
+        self.num_of_thread = max(1, min(num_of_thread, N // min_chunk))
+
+        # 非零要素数で均等なチャンク(ベクトル演算も同じ区間を使う)
+        self.offsets = balance(A, self.num_of_thread)
+        self.blocks = [None] * self.num_of_thread
+        self.partial = np.zeros(self.num_of_thread, self.dtype)
+
+        # 常駐スレッド
+        self.task = None
+        self.error = None
+        self.barrier = threading.Barrier(self.num_of_thread + 1)
+        self.threads = []
+        core_list = cores()
+        for i in range(self.num_of_thread):
+            core = core_list[i % len(core_list)] if numa else None
+            thread = threading.Thread(target=self._worker, args=(i, A, core), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.barrier.wait()
+
+    def _worker(self, i, A, core):
+        pin(core)
+        block = rows(A, self.offsets[i], self.offsets[i+1])
+        # NUMA: 担当ブロックを自分で複製してページを手元のノードに置く
+        self.blocks[i] = block.copy() if self.numa else block
+        self.barrier.wait()
+        while True:
+            self.barrier.wait()
+            task = self.task
+            if task is None:
+                return
+            try:
+                task(i, self.offsets[i], self.offsets[i+1])
+            except Exception as e:
+                self.error = e
+            self.barrier.wait()
+
+    # 全スレッドで task(i, begin, end) を実行する
+    def run(self, task):
+        self.task = task
+        self.barrier.wait()
+        self.barrier.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    # 行列ベクトル積(xが2次元なら行列積)
+    def dot(self, x, out=None):
+        if out is None:
+            out = np.empty((self.shape[0],) + x.shape[1:], np.result_type(self.dtype, x.dtype))
+
+        def matvec(i, begin, end):
+            out[begin:end] = self.blocks[i].dot(x)
+        self.run(matvec)
+        return out
+
+    matvec = dot
+
+    # 内積(チャンクごとの部分和を足し合わせる)
+    def vdot(self, x, y):
+        def partial(i, begin, end):
+            self.partial[i] = np.dot(x[begin:end], y[begin:end])
+        self.run(partial)
+        return self.partial.sum()
+
+    # y += alpha * x
+    def axpy(self, alpha, x, y):
+        def axpy(i, begin, end):
+            y[begin:end] += alpha * x[begin:end]
+        self.run(axpy)
+        return y
+
+    def norm(self, x):
+        return np.sqrt(self.vdot(x, x))
+
+    # ベクトル領域の確保. NUMAモードでは各スレッドが担当行を書き込む
+    def zeros(self, shape, T=None):
+        vector = np.empty(shape, T or self.dtype)
+        N = self.shape[0]
+        if not self.numa or vector.size % N != 0:
+            vector[...] = 0
+            return vector
+
+        def first_touch(i, begin, end):
+            touch(vector, N, begin, end)
+        self.run(first_touch)
+        return vector
+
+    # スレッドを終了する
+    def close(self):
+        if self.threads:
+            self.task = None
+            self.barrier.wait()
+            for thread in self.threads:
+                thread.join()
+        self.threads = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,82 @@
+import os
+import time
+
+import numpy as np
+
+from . import roofline, trace
+
+# フェーズ(Timer.toc の第1引数)
+BASIS, COEFFICIENTS, RECURRENCE, UPDATE, CONVERGENCE, COMMUNICATION = range(6)
+PHASES = ('basis', 'coefficients', 'recurrence', 'update', 'convergence', 'communication')
+
+
+class Timer(object):
+    """求解のフェーズごとの経過時間を積算する
+
+    KRYLOV_TIMINGS=1, KRYLOV_ROOFLINE=1 (または enabled=True), もしくはトレース(trace.tracer)があれば有効.
+    無効の場合 tic/toc は時刻を読まずに0を返すだけなので, 求解関数に組み込んだままにできる.
+    区間は前の区切りからの時間として数える:
+
+        t = timer.tic()
+        ...                          # 行列ベクトル積
+        t = timer.toc(BASIS, t)
+        ...                          # 内積
+        t = timer.toc(COEFFICIENTS, t)
+
+    basisは行列ベクトル積(更新中の積を含む), communicationはその内の通信待ち(MultiCpu.dot)で,
+    他のフェーズとは重複して数える.
+
+    Args:
+        enabled (bool, optional): Noneなら環境変数 KRYLOV_TIMINGS, KRYLOV_ROOFLINE またはトレースの有無
+        clock (callable, optional): 時刻(秒)を返す関数. MPIでは MPI.Wtime
+    """
+
+    def __init__(self, enabled=None, clock=time.perf_counter):
+        self.tracer = trace.tracer
+        if enabled is None:
+            enabled = '1' in (os.environ.get('KRYLOV_TIMINGS'), os.environ.get('KRYLOV_ROOFLINE')) or self.tracer is not None
+        self.enabled = enabled
+        self.clock = clock
+        self.elapsed = [0.0] * len(PHASES)
+        self.counts = [0] * len(PHASES)
+
+    def tic(self) -> float:
+        if not self.enabled:
+            return 0.0
+        return self.clock()
+
+    # 区間[start, 現在)をphaseに加え, 現在時刻(次の区間の開始)を返す. nameはトレースでの区間名
+    def toc(self, phase: int, start: float, name: str = None) -> float:
+        if not self.enabled:
+            return 0.0
+        now = self.clock()
+        self.elapsed[phase] += now - start
+        self.counts[phase] += 1
+        if self.tracer is not None:
+            self.tracer.span(name or PHASES[phase], PHASES[phase], start, now)
+        return now
+
+    def summary(self, comm=None) -> dict:
+        """フェーズごとの積算時間(秒)
+
+        Args:
+            comm (optional): MPIコミュニケータ. 指定すると全ランクの値を集める
+
+        Returns:
+            dict: {フェーズ名: 秒}. commを指定した場合は {フェーズ名: ランクごとの秒(ndarray)}
+        """
+        if comm is None:
+            return dict(zip(PHASES, self.elapsed))
+        local = np.array(self.elapsed)
+        ranks = np.zeros((comm.Get_size(), len(PHASES)))
+        comm.Allgather(local, ranks)
+        return {name: ranks[:, p] for p, name in enumerate(PHASES)}
+
+
+# 有効な計測の結果をinfoに加える: フェーズ時間, 演算数・転送量(KRYLOV_ROOFLINE=1)
+def summarize(info, A, timer, method, k=0) -> dict:
+    if timer.enabled:
+        info['timings'] = timer.summary()
+        if roofline.enabled():
+            info['roofline'] = roofline.analyse(method, info, info['timings'], A, k=k)
+    return info
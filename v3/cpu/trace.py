@@ -0,0 +1,73 @@
+import json
+import os
+
+
+class Tracer(object):
+    """求解のフェーズ・通信の開始/終了をChrome trace形式(Perfettoで開ける)で書き出す
+
+    KRYLOV_TRACE=出力ファイル で有効になり, モジュール変数 tracer に置かれる(無効ならNone).
+    Timer.toc(フェーズ), Communication(通信), start/finish(求解全体)が区間を加え,
+    finishのたびに前回から増えた区間だけをイベントにして書き出し済みのイベントに加え(区間は消す),
+    ファイルを書き直す. MPIでは全ランクの新しい区間をランク0が1つのファイルにまとめる
+    (mpi.common.finish. ランクごとに1トラック).
+
+    Args:
+        path (str): 出力ファイル(.json)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # (名前, 種類, 開始, 終了)
+        self.spans = []
+        # start で設定する求解の名前
+        self.name = ''
+        # 書き出し済みのイベント(MPIではランク0が全ランク分を持つ)
+        self.written = []
+        # 時刻0とする時刻(秒). 最初に書き出す時に決める
+        self.zero = None
+        # トラック名(process_name)を出したか
+        self.named = False
+
+    def span(self, name, category, begin, end) -> None:
+        self.spans.append((name, category, begin, end))
+
+    # 最初の区間の開始時刻
+    def origin(self) -> float:
+        return min((begin for _, _, begin, _ in self.spans), default=float('inf'))
+
+    def take(self, pid=0) -> list:
+        """前回から増えた区間を1トラック分のイベントにして, 区間を消す
+
+        Args:
+            pid (int, optional): トラック番号(MPIではランク)
+
+        Returns:
+            list: Chrome traceのイベント(時刻はzeroからのマイクロ秒)
+        """
+        if self.zero is None:
+            self.zero = self.origin()
+        events = []
+        if not self.named:
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': f'rank { pid }'}})
+            self.named = True
+        for name, category, begin, end in self.spans:
+            events.append({
+                'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': 0,
+                'ts': (begin - self.zero) * 1e6, 'dur': (end - begin) * 1e6,
+            })
+        self.spans.clear()
+        return events
+
+    def write(self, events=None, path=None) -> None:
+        """新しいイベントを書き出し済みのイベントに加えて書き出す
+
+        Args:
+            events (list, optional): 新しいイベント. Noneなら自身の新しい区間(take)
+            path (str, optional): 出力ファイル. Noneならpath
+        """
+        self.written.extend(self.take() if events is None else events)
+        with open(path or self.path, 'w') as f:
+            json.dump({'traceEvents': self.written, 'displayTimeUnit': 'ms'}, f)
+
+
+tracer = Tracer(os.environ['KRYLOV_TRACE']) if os.environ.get('KRYLOV_TRACE') else None
@@ -0,0 +1,98 @@
+import glob
+import os
+
+import numpy as np
+import scipy.sparse
+
+from .common import compress
+
+
+def _laplacian1d(n):
+    return scipy.sparse.diags([-1, 2, -1], [-1, 0, 1], shape=(n, n), format='csr')
+
+
+# 2次元Poisson(5点ステンシル). 行数は n^2 (n = sqrt(N))
+def poisson2d(N):
+    n = max(2, int(round(N ** (1 / 2))))
+    T = _laplacian1d(n)
+    return scipy.sparse.kronsum(T, T, format='csr')
+
+
+# 3次元Poisson(7点ステンシル). 行数は n^3 (n = cbrt(N))
+def poisson3d(N):
+    n = max(2, int(round(N ** (1 / 3))))
+    T = _laplacian1d(n)
+    return scipy.sparse.kronsum(scipy.sparse.kronsum(T, T), T, format='csr')
+
+
+# 異方性拡散: y方向の係数をepsilon倍した2次元Poisson(条件数が悪い)
+def anisotropic(N, epsilon=1e-3):
+    n = max(2, int(round(N ** (1 / 2))))
+    T = _laplacian1d(n)
+    return scipy.sparse.kronsum(T, epsilon * T, format='csr')
+
+
+# ランダムな対称正定値行列(対角優位). 1行あたり約degree個の非対角要素
+def random_spd(N, degree=8, seed=0):
+    R = scipy.sparse.random(N, N, density=min(1.0, degree / 2 / N), random_state=seed, format='csr')
+    S = R + R.T
+    return (S + scipy.sparse.diags(np.asarray(abs(S).sum(axis=1)).ravel() + 1)).tocsr()
+
+
+# 帯行列: 半帯幅bandwidthの対称正定値行列(対角優位)
+def banded(N, bandwidth=16, seed=0):
+    rng = np.random.default_rng(seed)
+    offsets = list(range(1, bandwidth + 1))
+    diagonals = [rng.random(N - offset) for offset in offsets]
+    U = scipy.sparse.diags(diagonals, offsets, shape=(N, N), format='csr')
+    S = U + U.T
+    return (S + scipy.sparse.diags(np.asarray(S.sum(axis=1)).ravel() + 1)).tocsr()
+
+
+# ランダムグラフのラプラシアン + shift * I (正定値にする)
+def graph_laplacian(N, degree=6, shift=1e-2, seed=0):
+    rng = np.random.default_rng(seed)
+    num_of_edge = N * degree // 2
+    u, v = rng.integers(0, N, num_of_edge), rng.integers(0, N, num_of_edge)
+    keep = u != v
+    W = scipy.sparse.coo_matrix((np.ones(keep.sum()), (u[keep], v[keep])), shape=(N, N)).tocsr()
+    W = W + W.T
+    W.data[:] = 1
+    degrees = np.asarray(W.sum(axis=1)).ravel()
+    return (scipy.sparse.diags(degrees + shift) - W).tocsr()
+
+
+# 生成器の一覧
+GENERATORS = {
+    'poisson2d': poisson2d,
+    'poisson3d': poisson3d,
+    'anisotropic': anisotropic,
+    'random_spd': random_spd,
+    'banded': banded,
+    'graph_laplacian': graph_laplacian,
+}
+
+
+def zoo(sizes=(10000,), names=None, directory=None):
+    """ベンチマーク用の行列を順に返す
+
+    Args:
+        sizes (tuple, optional): 生成する行列のおよその行数
+        names (list, optional): 使う生成器の名前. Noneなら全て
+        directory (str, optional): このディレクトリの .mtx, .npz, .kmat も加える.
+            Noneなら環境変数 KRYLOV_MATRICES
+
+    Returns:
+        iterator: (名前, CSR行列)
+    """
+    for name in names or GENERATORS:
+        for N in sizes:
+            A = compress(GENERATORS[name](N))
+            yield f'{ name }-{ A.shape[0] }', A
+
+    if directory is None:
+        directory = os.environ.get('KRYLOV_MATRICES')
+    if directory:
+        from .cache import read
+        for path in sorted(sum((glob.glob(os.path.join(directory, pattern)) for pattern in ('*.mtx', '*.npz', '*.kmat')), [])):
+            yield os.path.basename(path), compress(scipy.sparse.csr_matrix(read(path)))
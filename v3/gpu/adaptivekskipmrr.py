@@ -10,9 +10,8 @@ from .common import start, finish, init, MultiGpu
 def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
     # 初期化
     T = float64
-    MultiGpu.init()
     b, x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiGpu.alloc(A, b, T)
+    A = MultiGpu.prepare(A, b, T)
 
     Ar = cp.zeros((k + 3, N), T)
     Ay = cp.zeros((k + 2, N), T)
@@ -24,13 +23,13 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
     k_history[0] = k
 
     # 初期残差
-    Ar[0] = b - MultiGpu.dot(A, x)
+    Ar[0] = b - A.dot(x)
     residual[0] = norm(Ar[0]) / b_norm
     pre_residual = residual[0]
 
     # 初期反復
     start_time = start(method_name='Adaptive k-skip MrR + GPU', k=k)
-    Ar[1] = MultiGpu.dot(A, Ar[0])
+    Ar[1] = A.dot(Ar[0])
     rAr = dot(Ar[0], Ar[1])
     ArAr = dot(Ar[1], Ar[1])
     zeta = rAr / ArAr
@@ -50,8 +49,8 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
         if residual[index] > pre_residual:
             # 残差と解を直前の状態に戻す
             x = pre_x.copy()
-            Ar[0] = b - MultiGpu.dot(A, x)
-            Ar[1] = MultiGpu.dot(A, Ar[0])
+            Ar[0] = b - A.dot(x)
+            Ar[1] = A.dot(Ar[0])
             rAr = dot(Ar[0], Ar[1])
             ArAr = dot(Ar[1], Ar[1])
             zeta = rAr / ArAr
@@ -80,9 +79,9 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
 
         # 事前計算
         for j in range(1, k + 2):
-            Ar[j] = MultiGpu.dot(A, Ar[j-1])
+            Ar[j] = A.dot(Ar[j-1])
         for j in range(1, k + 1):
-            Ay[j] = MultiGpu.dot(A, Ay[j-1])
+            Ay[j] = A.dot(Ay[j-1])
 
         for j in range(2 * k + 3):
             jj = j // 2
@@ -101,7 +100,7 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
         Ar[0] -= Ay[0]
-        Ar[1] = MultiGpu.dot(A, Ar[0])
+        Ar[1] = A.dot(Ar[0])
         x -= z
 
         # MrRでのk反復
@@ -126,7 +125,7 @@ def adaptivekskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callbac
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
             Ar[0] -= Ay[0]
-            Ar[1] = MultiGpu.dot(A, Ar[0])
+            Ar[1] = A.dot(Ar[0])
             x -= z
 
         i += (k + 1)
@@ -8,12 +8,11 @@ from .common import start, finish, init, MultiGpu
 def cg(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None) -> tuple:
     # 初期化
     T = float64
-    MultiGpu.init()
     b, x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiGpu.alloc(A, b, T)
+    A = MultiGpu.prepare(A, b, T)
 
     # 初期残差
-    r = b - MultiGpu.dot(A, x)
+    r = b - A.dot(x)
     p = r.copy()
     gamma = dot(r, r)
 
@@ -28,7 +27,7 @@ def cg(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None)
             break
 
         # 解の更新
-        v = MultiGpu.dot(A, p)
+        v = A.dot(p)
         sigma = dot(p, v)
         alpha = gamma / sigma
         x += alpha * p
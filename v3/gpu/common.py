@@ -7,6 +7,18 @@ from cupy.cuda.runtime import getDeviceCount
 
 from ..common import _start, _finish
 
+# cudaErrorPeerAccessAlreadyEnabled
+PEER_ACCESS_ALREADY_ENABLED = 704
+
+
+# P2Pを有効にする. 有効化済み以外のエラーはそのまま送出する
+def enable_peer_access(peer):
+    try:
+        cp.cuda.runtime.deviceEnablePeerAccess(peer)
+    except cp.cuda.runtime.CUDARuntimeError as e:
+        if e.status != PEER_ACCESS_ALREADY_ENABLED:
+            raise
+
 
 # 計測開始
 def start(method_name: str = '', k: int = None) -> float:
@@ -41,86 +53,81 @@ def init(b, x=None, maxiter=None) -> tuple:
 
 
 class MultiGpu(object):
-    # numbers
-    begin: int = 0
-    end: int = 0
-    num_of_gpu: int = 0
-    # dimentinal size
-    N: int = 0
-    local_N: int = 0
-    # matrix
-    A: list = []
-    # vector
-    x: list = []
-    y: list = []
-    out: np.ndarray = None
-    # gpu stream
-    streams = None
+    # GPU・行列・バッファはインスタンスごとに持つ
+    # (スレッドごとに別の求解を同時に実行できる)
 
-    # GPUの初期化
+    def __init__(self, A, b, T=np.float64):
+        self.init()
+        self.alloc(A, b, T)
+
+    # 用意済みの演算子はそのまま使う
     @classmethod
-    def init(cls):
-        cls.begin = 0
-        cls.end = getDeviceCount() - 1
-        cls.num_of_gpu = getDeviceCount()
-        cls.streams = [None] * cls.num_of_gpu
+    def prepare(cls, A, b, T=np.float64):
+        if isinstance(A, cls):
+            return A
+        return cls(A, b, T)
+
+    # GPUの初期化
+    def init(self):
+        self.begin = 0
+        self.end = getDeviceCount() - 1
+        self.num_of_gpu = getDeviceCount()
+        self.streams = [None] * self.num_of_gpu
 
         # init memory allocator
-        for i in range(cls.num_of_gpu):
+        for i in range(self.num_of_gpu):
             Device(i).use()
             pool = cp.cuda.MemoryPool(cp.cuda.malloc_managed)
             cp.cuda.set_allocator(pool.malloc)
-            cls.streams[i] = cp.cuda.Stream()
+            self.streams[i] = cp.cuda.Stream()
 
             # Enable P2P
-            for j in range(cls.num_of_gpu):
+            for j in range(self.num_of_gpu):
                 if i == j:
                     continue
-                cp.cuda.runtime.deviceEnablePeerAccess(j)
+                enable_peer_access(j)
 
     # メモリー領域を確保
-    @classmethod
-    def alloc(cls, A, b, T):
+    def alloc(self, A, b, T):
         # dimentional size
-        cls.N = b.size
-        cls.local_N = cls.N // cls.num_of_gpu
+        self.N = b.size
+        self.local_N = self.N // self.num_of_gpu
         # byte size
-        cls.nbytes = b.nbytes
-        cls.local_nbytes = b.nbytes // cls.num_of_gpu
+        self.nbytes = b.nbytes
+        self.local_nbytes = b.nbytes // self.num_of_gpu
 
         # init list
-        cls.A = [None] * cls.num_of_gpu
-        cls.x = [None] * cls.num_of_gpu
-        cls.y = [None] * cls.num_of_gpu
+        self.A = [None] * self.num_of_gpu
+        self.x = [None] * self.num_of_gpu
+        self.y = [None] * self.num_of_gpu
 
         # allocate A, x, y
-        for i in range(cls.num_of_gpu):
+        for i in range(self.num_of_gpu):
             Device(i).use()
             # divide A
             if isinstance(A, np.ndarray):
-                cls.A[i] = cp.array(A[i*cls.local_N:(i+1)*cls.local_N], T)
+                self.A[i] = cp.array(A[i*self.local_N:(i+1)*self.local_N], T)
             else:
                 from cupyx.scipy.sparse import csr_matrix
-                cls.A[i] = csr_matrix(A[i*cls.local_N:(i+1)*cls.local_N])
-            cls.x[i] = cp.zeros(cls.N, T)
-            cls.y[i] = cp.zeros(cls.local_N, T)
+                self.A[i] = csr_matrix(A[i*self.local_N:(i+1)*self.local_N])
+            self.x[i] = cp.zeros(self.N, T)
+            self.y[i] = cp.zeros(self.local_N, T)
 
         # allocate output vector
-        cls.out = cp.zeros(cls.N, T)
+        self.out = cp.zeros(self.N, T)
 
     # matvec with multi-gpu
-    @classmethod
-    def dot(cls, A, x):
+    def dot(self, x):
         # copy to workers
-        for i in range(cls.num_of_gpu):
+        for i in range(self.num_of_gpu):
             Device(i).use()
-            cp.cuda.runtime.memcpyPeerAsync(cls.x[i].data.ptr, i, x.data.ptr, cls.end, cls.nbytes, cls.streams[i].ptr)
+            cp.cuda.runtime.memcpyPeerAsync(self.x[i].data.ptr, i, x.data.ptr, self.end, self.nbytes, self.streams[i].ptr)
             # dot
-            cls.y[i] = cls.A[i].dot(cls.x[i])
+            self.y[i] = self.A[i].dot(self.x[i])
         # copy to master
-        for i in range(cls.num_of_gpu):
-            cp.cuda.runtime.memcpyPeerAsync(cls.out[i*cls.local_N].data.ptr, cls.end, cls.y[i].data.ptr, i, cls.local_nbytes, cls.streams[i].ptr)
+        for i in range(self.num_of_gpu):
+            cp.cuda.runtime.memcpyPeerAsync(self.out[i*self.local_N].data.ptr, self.end, self.y[i].data.ptr, i, self.local_nbytes, self.streams[i].ptr)
         # sync
-        for i in range(cls.num_of_gpu):
-            cls.streams[i].synchronize()
-        return cls.out
+        for i in range(self.num_of_gpu):
+            self.streams[i].synchronize()
+        return self.out
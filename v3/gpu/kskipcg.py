@@ -9,9 +9,8 @@ from .common import start, finish, init, MultiGpu
 def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
     # 初期化
     T = float64
-    MultiGpu.init()
     b, x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiGpu.alloc(A, b, T)
+    A = MultiGpu.prepare(A, b, T)
 
     # 初期化
     Ar = cp.zeros((k + 2, N), T)
@@ -21,7 +20,7 @@ def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, a
     c = cp.zeros(2 * k + 2, T)
 
     # 初期残差
-    Ar[0] = b - MultiGpu.dot(A, x)
+    Ar[0] = b - A.dot(x)
     Ap[0] = Ar[0]
 
     # 反復計算
@@ -37,9 +36,9 @@ def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, a
 
         # 事前計算
         for j in range(1, k + 1):
-            Ar[j] = MultiGpu.dot(A, Ar[j-1])
+            Ar[j] = A.dot(Ar[j-1])
         for j in range(1, k + 2):
-            Ap[j] = MultiGpu.dot(A, Ap[j-1])
+            Ap[j] = A.dot(Ap[j-1])
 
         for j in range(2 * k + 1):
             jj = j // 2
@@ -57,7 +56,7 @@ def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, a
         x += alpha * Ap[0]
         Ar[0] -= alpha * Ap[1]
         Ap[0] = Ar[0] + beta * Ap[0]
-        Ap[1] = MultiGpu.dot(A, Ap[0])
+        Ap[1] = A.dot(Ap[0])
 
         # CGでのk反復
         for j in range(0, k):
@@ -73,7 +72,7 @@ def kskipcg(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, a
             x += alpha * Ap[0]
             Ar[0] -= alpha * Ap[1]
             Ap[0] = Ar[0] + beta * Ap[0]
-            Ap[1] = MultiGpu.dot(A, Ap[0])
+            Ap[1] = A.dot(Ap[0])
 
         i += (k + 1)
         index += 1
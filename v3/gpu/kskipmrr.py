@@ -9,9 +9,8 @@ from .common import start, finish, init, MultiGpu
 def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
     # 初期化
     T = float64
-    MultiGpu.init()
     b, x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiGpu.alloc(A, b, T)
+    A = MultiGpu.prepare(A, b, T)
 
     Ar = cp.zeros((k + 2, N), T)
     Ay = cp.zeros((k + 1, N), T)
@@ -20,12 +19,12 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
     delta = cp.zeros(2 * k + 1, T)
 
     # 初期残差
-    Ar[0] = b - MultiGpu.dot(A, x)
+    Ar[0] = b - A.dot(x)
     residual[0] = norm(Ar[0]) / b_norm
 
     # 初期反復
     start_time = start(method_name='k-skip MrR + GPU', k=k)
-    Ar[1] = MultiGpu.dot(A, Ar[0])
+    Ar[1] = A.dot(Ar[0])
     zeta = dot(Ar[0], Ar[1]) / dot(Ar[1], Ar[1])
     Ay[0] = zeta * Ar[1]
     z = -zeta * Ar[0]
@@ -45,9 +44,9 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
 
         # 基底計算
         for j in range(1, k + 2):
-            Ar[j] = MultiGpu.dot(A, Ar[j-1])
+            Ar[j] = A.dot(Ar[j-1])
         for j in range(1, k + 1):
-            Ay[j] = MultiGpu.dot(A, Ay[j-1])
+            Ay[j] = A.dot(Ay[j-1])
 
         # 係数計算
         for j in range(2 * k + 3):
@@ -67,7 +66,7 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
         Ar[0] -= Ay[0]
-        Ar[1] = MultiGpu.dot(A, Ar[0])
+        Ar[1] = A.dot(Ar[0])
         x -= z
 
         # MrRでのk反復
@@ -91,7 +90,7 @@ def kskipmrr(A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None,
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
             Ar[0] -= Ay[0]
-            Ar[1] = MultiGpu.dot(A, Ar[0])
+            Ar[1] = A.dot(Ar[0])
             x -= z
 
         i += (k + 1)
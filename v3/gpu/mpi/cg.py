@@ -4,25 +4,22 @@ from cupy import dot
 from cupy.linalg import norm
 from mpi4py import MPI
 
-from .common import start, finish, init, MultiGpu
+from .common import start, finish, init, distribute, MultiGpu
 
 
-def cg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None) -> tuple:
+def cg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None, layout='allgather') -> tuple:
     # MPI初期化
     rank = comm.Get_rank()
-    MultiGpu.joint_mpi(comm)
 
     # 初期化
     T = float64
-    ## GPU初期化
-    MultiGpu.init()
     b, x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiGpu.alloc(local_A, b, T)
+    A = MultiGpu.prepare(comm, local_A, b, T)
     Ax = cp.zeros(N, T)
     v = cp.zeros(N, T)
 
     # 初期残差
-    MultiGpu.dot(local_A, x, out=Ax)
+    A.dot(x, out=Ax)
     r = b - Ax
     p = r.copy()
     gamma = dot(r, r)
@@ -30,8 +27,7 @@ def cg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None,
     # 反復計算
     i = 0
 
-    if rank == 0:
-        start_time = start(method_name='CG + GPU + MPI')
+    start_time = start(method_name='CG + GPU + MPI', verbose=rank == 0)
 
     while i < maxiter:
         # 収束判定
@@ -41,7 +37,7 @@ def cg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None,
             break
 
         # 解の更新
-        MultiGpu.dot(local_A, p, out=v)
+        A.dot(p, out=v)
         sigma = dot(p, v)
         alpha = gamma / sigma
         x += alpha * p
@@ -56,13 +52,10 @@ def cg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None,
         isConverged = False
         residual[i] = norm(r) / b_norm
 
-    if rank == 0:
-        elapsed_time = finish(start_time, isConverged, i, residual[i])
-        info = {
-            'time': elapsed_time,
-            'nosl': num_of_solution_updates[:i+1],
-            'residual': residual[:i+1],
-        }
-        return x, info
-    else:
-        exit(0)
+    elapsed_time = finish(start_time, isConverged, i, residual[i], verbose=rank == 0)
+    info = {
+        'time': elapsed_time,
+        'nosl': num_of_solution_updates[:i+1],
+        'residual': residual[:i+1],
+    }
+    return distribute(x, comm, A.local_N, layout), info
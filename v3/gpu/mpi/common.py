@@ -8,22 +8,35 @@ from mpi4py import MPI
 
 # import socket
 
-from ..common import _start, _finish
+from ..common import _start, _finish, enable_peer_access
 
 
 # 計測開始
-def start(method_name='', k=None):
-    _start(method_name, k)
+def start(method_name='', k=None, verbose=True):
+    if verbose:
+        _start(method_name, k)
     return MPI.Wtime()
 
 
 # 計測終了
-def finish(start_time, isConverged, num_of_iter, final_residual, final_k=None):
+def finish(start_time, isConverged, num_of_iter, final_residual, final_k=None, verbose=True):
     elapsed_time = MPI.Wtime() - start_time
-    _finish(elapsed_time, isConverged, num_of_iter, final_residual, final_k)
+    if verbose:
+        _finish(elapsed_time, isConverged, num_of_iter, final_residual, final_k)
     return elapsed_time
 
 
+# 解の返し方
+# 'allgather': 全ランクが解全体を返す, 'scatter': 各ランクが担当行のみを返す
+def distribute(x, comm, local_N, layout='allgather'):
+    if layout == 'allgather':
+        return x
+    if layout == 'scatter':
+        begin = comm.Get_rank() * local_N
+        return x[begin:begin+local_N].copy()
+    raise ValueError(f"layout must be 'allgather' or 'scatter', not '{ layout }'")
+
+
 # パラメータの初期化
 def init(b, x=None, maxiter=None) -> tuple:
     T = np.float64
@@ -44,128 +57,113 @@ def init(b, x=None, maxiter=None) -> tuple:
 
 
 class MultiGpu(object):
-    # numbers
-    begin: int = 0
-    end: int = 0
-    num_of_gpu: int = 0
-    num_of_process: int = 0
-    # dimentinal size
-    N: int = 0
-    local_N: int = 0
-    local_local_N: int = 0
-    # matrix
-    A: list = []
-    # vector
-    x: list = []
-    y: list = []
-    out: np.ndarray = None
-    # byte size
-    nbytes: int = 0
-    local_nbytes: int = 0
-    local_local_nbytes: int = 0
-    # mpi
-    comm = None
-    # gpu stream
-    streams = None
+    # GPU・通信・行列・バッファはインスタンスごとに持つ
+    # (サブコミュニケータ/スレッドごとに別の求解を同時に実行できる)
+
+    def __init__(self, comm, local_A, b, T=np.float64):
+        # mpi
+        self.comm = comm
+        self.num_of_process = comm.Get_size()
+        # GPU初期化
+        self.init()
+        self.alloc(local_A, b, T)
+
+    # 用意済みの演算子はそのまま使う
+    @classmethod
+    def prepare(cls, comm, local_A, b, T=np.float64):
+        if isinstance(local_A, cls):
+            return local_A
+        return cls(comm, local_A, b, T)
 
     # GPUの初期化
-    @classmethod
-    def init(cls):
+    def init(self):
         # ip = socket.gethostbyname(socket.gethostname())
         # rank = os.environ['MV2_COMM_WORLD_RANK']
         # local_rank = os.environ['MV2_COMM_WORLD_LOCAL_RANK']
         if os.environ.get('GPU_IDS') != None:
             ids = os.environ['GPU_IDS'].split(',')
-            cls.begin = int(ids[0])
-            cls.end = int(ids[-1])
+            self.begin = int(ids[0])
+            self.end = int(ids[-1])
         else:
-            cls.begin = 0
-            cls.end = getDeviceCount() - 1
-        cls.num_of_gpu = cls.end - cls.begin + 1
-        cls.streams = [None] * cls.num_of_gpu
+            self.begin = 0
+            self.end = getDeviceCount() - 1
+        self.num_of_gpu = self.end - self.begin + 1
+        self.streams = [None] * self.num_of_gpu
 
         # init memory allocator
-        for i in range(cls.begin, cls.end+1):
+        for i in range(self.begin, self.end+1):
             Device(i).use()
             pool = cp.cuda.MemoryPool(cp.cuda.malloc_managed)
             cp.cuda.set_allocator(pool.malloc)
-            cls.streams[i-cls.begin] = cp.cuda.Stream(non_blocking=False)
+            self.streams[i-self.begin] = cp.cuda.Stream(non_blocking=False)
         
             # Enable P2P
             for j in range(4):
                 if i == j:
                     continue
-                cp.cuda.runtime.deviceEnablePeerAccess(j)
+                enable_peer_access(j)
     
     # メモリー領域を確保
-    @classmethod
-    def alloc(cls, local_A, b, T):
+    def alloc(self, local_A, b, T):
         # dimentional size
-        cls.local_N, cls.N = local_A.shape
-        cls.local_local_N = cls.local_N // cls.num_of_gpu
+        self.local_N, self.N = local_A.shape
+        self.local_local_N = self.local_N // self.num_of_gpu
         # byte size
-        cls.nbytes = b.nbytes
-        cls.local_nbytes = cls.nbytes // cls.num_of_process
-        cls.local_local_nbytes = cls.local_nbytes // cls.num_of_gpu
+        self.nbytes = b.nbytes
+        self.local_nbytes = self.nbytes // self.num_of_process
+        self.local_local_nbytes = self.local_nbytes // self.num_of_gpu
 
         # init list
-        cls.A = [None] * cls.num_of_gpu
-        cls.x = [None] * cls.num_of_gpu
-        cls.y = [None] * cls.num_of_gpu
+        self.A = [None] * self.num_of_gpu
+        self.x = [None] * self.num_of_gpu
+        self.y = [None] * self.num_of_gpu
 
         # divide single A -> multi local_A
         # allocate x, y
-        for i in range(cls.begin, cls.end+1):
+        for i in range(self.begin, self.end+1):
             Device(i).use()
-            index = i-cls.begin
+            index = i-self.begin
             # local_Aは1/8
-            begin, end = index*cls.local_local_N, (index+1)*cls.local_local_N
+            begin, end = index*self.local_local_N, (index+1)*self.local_local_N
             # npy
             if isinstance(local_A, np.ndarray):
-                cls.A[index] = cp.array(local_A[begin:end], T)
+                self.A[index] = cp.array(local_A[begin:end], T)
             # npz
             elif isinstance(local_A, scipy.sparse.csr.csr_matrix):
                 from cupyx.scipy.sparse import csr_matrix
-                cls.A[index] = csr_matrix(local_A[begin:end])
-            cls.x[index] = cp.zeros(cls.N, T)
-            cls.y[index] = cp.zeros(cls.local_local_N, T)
+                self.A[index] = csr_matrix(local_A[begin:end])
+            self.x[index] = cp.zeros(self.N, T)
+            self.y[index] = cp.zeros(self.local_local_N, T)
 
         # init out vector
-        cls.out = cp.zeros(cls.local_N, T)
+        self.out = cp.zeros(self.local_N, T)
 
     # マルチGPUを用いた行列ベクトル積
-    @classmethod
-    def dot(cls, local_A, x, out):
+    def dot(self, x, out):
         # Copy vector data to All devices
-        for i in range(cls.begin, cls.end+1):
+        for i in range(self.begin, self.end+1):
             # Device(i).use()
-            index = i-cls.begin
-            # cp.cuda.runtime.memcpyPeerAsync(cls.x[index].data.ptr, i, x.data.ptr, cls.end, cls.nbytes, cls.streams[index].ptr)
-            cp.cuda.runtime.memcpyPeer(cls.x[index].data.ptr, i, x.data.ptr, cls.end, cls.nbytes)
+            index = i-self.begin
+            # cp.cuda.runtime.memcpyPeerAsync(self.x[index].data.ptr, i, x.data.ptr, self.end, self.nbytes, self.streams[index].ptr)
+            cp.cuda.runtime.memcpyPeer(self.x[index].data.ptr, i, x.data.ptr, self.end, self.nbytes)
             # dot
-        for i in range(cls.begin, cls.end+1):
-            index = i-cls.begin
+        for i in range(self.begin, self.end+1):
+            index = i-self.begin
             Device(i).use()
-            # cls.streams[index].synchronize()
-            cls.y[index] = cls.A[index].dot(cls.x[index])
+            # self.streams[index].synchronize()
+            self.y[index] = self.A[index].dot(self.x[index])
         # Gather caculated element from All devices
-        for i in range(cls.begin, cls.end+1):
+        for i in range(self.begin, self.end+1):
             Device(i).synchronize()
-            index = i-cls.begin
-            # cp.cuda.runtime.memcpyPeerAsync(cls.out[index*cls.local_local_N].data.ptr, cls.end, cls.y[index].data.ptr, i, cls.local_local_nbytes, cls.streams[index].ptr)
-            cp.cuda.runtime.memcpyPeer(cls.out[index*cls.local_local_N].data.ptr, cls.end, cls.y[index].data.ptr, i, cls.y[index].nbytes)
+            index = i-self.begin
+            # cp.cuda.runtime.memcpyPeerAsync(self.out[index*self.local_local_N].data.ptr, self.end, self.y[index].data.ptr, i, self.local_local_nbytes, self.streams[index].ptr)
+            cp.cuda.runtime.memcpyPeer(self.out[index*self.local_local_N].data.ptr, self.end, self.y[index].data.ptr, i, self.y[index].nbytes)
 
         # # sync
-        # for i in range(cls.begin, cls.end+1):
-        #     index = i-cls.begin
-        #     cls.streams[index].synchronize()
+        # for i in range(self.begin, self.end+1):
+        #     index = i-self.begin
+        #     self.streams[index].synchronize()
 
-        cls.comm.Allgather(cls.out, out)
+        self.comm.Allgather(self.out, out)
         # return
         return out
-    
-    # joint comm
-    @classmethod
-    def joint_mpi(cls, comm):
-        cls.comm = comm
-        cls.num_of_process = comm.Get_size()
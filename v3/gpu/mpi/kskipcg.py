@@ -4,20 +4,17 @@ from cupy import dot
 from cupy.linalg import norm
 from mpi4py import MPI
 
-from .common import start, finish, init, MultiGpu
+from .common import start, finish, init, distribute, MultiGpu
 
 
-def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
+def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None, layout='allgather') -> tuple:
     # MPI初期化
     rank = comm.Get_rank()
-    MultiGpu.joint_mpi(comm)
 
     # 初期化
     T = float64
-    ## GPU初期化
-    MultiGpu.init()
     b, x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiGpu.alloc(local_A, b, T)
+    A = MultiGpu.prepare(comm, local_A, b, T)
     Ax = cp.zeros(N, T)
     Ar = cp.zeros((k + 2, N), T)
     Ap = cp.zeros((k + 3, N), T)
@@ -26,15 +23,14 @@ def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, call
     c = cp.zeros(2*k + 2, T)
 
     # 初期残差
-    MultiGpu.dot(local_A, x, out=Ax)
+    A.dot(x, out=Ax)
     Ar[0] = b - Ax
     Ap[0] = Ar[0].copy()
 
     # 反復計算
     i = 0
     index = 0
-    if rank == 0:
-        start_time = start(method_name='k-skip CG + GPU + MPI', k=k)
+    start_time = start(method_name='k-skip CG + GPU + MPI', k=k, verbose=rank == 0)
     while i < maxiter:
         # 収束判定
         residual[index] = norm(Ar[0]) / b_norm
@@ -44,9 +40,9 @@ def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, call
 
         # 基底計算
         for j in range(1, k + 1):
-            MultiGpu.dot(local_A, Ar[j-1], out=Ar[j])
+            A.dot(Ar[j-1], out=Ar[j])
         for j in range(1, k + 2):
-            MultiGpu.dot(local_A, Ap[j-1], out=Ap[j])
+            A.dot(Ap[j-1], out=Ap[j])
 
         # 係数計算
         for j in range(2 * k + 1):
@@ -66,7 +62,7 @@ def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, call
         x += alpha * Ap[0]
         Ar[0] -= alpha * Ap[1]
         Ap[0] = Ar[0] + beta * Ap[0]
-        MultiGpu.dot(local_A, Ap[0], out=Ap[1])
+        A.dot(Ap[0], out=Ap[1])
 
         # CGでのk反復
         for j in range(k):
@@ -82,7 +78,7 @@ def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, call
             x += alpha * Ap[0]
             Ar[0] -= alpha * Ap[1]
             Ap[0] = Ar[0] + beta * Ap[0]
-            MultiGpu.dot(local_A, Ap[0], out=Ap[1])
+            A.dot(Ap[0], out=Ap[1])
 
         i += (k + 1)
         index += 1
@@ -91,13 +87,10 @@ def kskipcg(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, call
         isConverged = False
         residual[index] = norm(Ar[0]) / b_norm
 
-    if rank == 0:
-        elapsed_time = finish(start_time, isConverged, i, residual[index])
-        info = {
-            'time': elapsed_time,
-            'nosl': num_of_solution_updates[:index+1],
-            'residual': residual[:index+1],
-        }
-        return x, info
-    else:
-        exit(0)
+    elapsed_time = finish(start_time, isConverged, i, residual[index], verbose=rank == 0)
+    info = {
+        'time': elapsed_time,
+        'nosl': num_of_solution_updates[:index+1],
+        'residual': residual[:index+1],
+    }
+    return distribute(x, comm, A.local_N, layout), info
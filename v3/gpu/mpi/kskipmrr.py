@@ -4,20 +4,17 @@ from cupy import dot
 from cupy.linalg import norm
 from mpi4py import MPI
 
-from .common import start, finish, init, MultiGpu
+from .common import start, finish, init, distribute, MultiGpu
 
 
-def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None) -> tuple:
+def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, callback=None, atol=None, layout='allgather') -> tuple:
     # MPI初期化
     rank = comm.Get_rank()
-    MultiGpu.joint_mpi(comm)
 
     # 初期化
     T = float64
-    ## GPU初期化
-    MultiGpu.init()
     b, x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiGpu.alloc(local_A, b, T)
+    A = MultiGpu.prepare(comm, local_A, b, T)
     Ax = cp.zeros(N, T)
     Ar = cp.zeros((k + 2, N), T)
     Ay = cp.zeros((k + 1, N), T)
@@ -26,14 +23,13 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
     delta = cp.zeros(2 * k + 1, T)
 
     # 初期残差
-    MultiGpu.dot(local_A, x, out=Ax)
+    A.dot(x, out=Ax)
     Ar[0] = b - Ax
     residual[0] = norm(Ar[0]) / b_norm
 
     # 初期反復
-    if rank == 0:
-        start_time = start(method_name='k-skip MrR + GPU + MPI', k=k)
-    MultiGpu.dot(local_A, Ar[0], out=Ar[1])
+    start_time = start(method_name='k-skip MrR + GPU + MPI', k=k, verbose=rank == 0)
+    A.dot(Ar[0], out=Ar[1])
     zeta = dot(Ar[0], Ar[1]) / dot(Ar[1], Ar[1])
     Ay[0] = zeta * Ar[1]
     z = -zeta * Ar[0]
@@ -53,9 +49,9 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
 
         # 基底計算
         for j in range(1, k + 2):
-            MultiGpu.dot(local_A, Ar[j-1], out=Ar[j])
+            A.dot(Ar[j-1], out=Ar[j])
         for j in range(1, k + 1):
-            MultiGpu.dot(local_A, Ay[j-1], out=Ay[j])
+            A.dot(Ay[j-1], out=Ay[j])
 
         # 係数計算
         for j in range(2 * k + 3):
@@ -75,7 +71,7 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
         Ay[0] = eta * Ay[0] + zeta * Ar[1]
         z = eta * z - zeta * Ar[0]
         Ar[0] -= Ay[0]
-        MultiGpu.dot(local_A, Ar[0], out=Ar[1])
+        A.dot(Ar[0], out=Ar[1])
         x -= z
 
         # MrRでのk反復
@@ -99,7 +95,7 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
             Ay[0] = eta * Ay[0] + zeta * Ar[1]
             z = eta * z - zeta * Ar[0]
             Ar[0] -= Ay[0]
-            MultiGpu.dot(local_A, Ar[0], out=Ar[1])
+            A.dot(Ar[0], out=Ar[1])
             x -= z
 
         i += (k + 1)
@@ -109,13 +105,10 @@ def kskipmrr(comm, local_A, b, x=None, tol=1e-05, maxiter=None, k=0, M=None, cal
         isConverged = False
         residual[index] = norm(Ar[0]) / b_norm
 
-    if rank == 0:
-        elapsed_time = finish(start_time, isConverged, i, residual[index])
-        info = {
-            'time': elapsed_time,
-            'nosl': num_of_solution_updates[:index+1],
-            'residual': residual[:index+1],
-        }
-        return x, info
-    else:
-        exit(0)
+    elapsed_time = finish(start_time, isConverged, i, residual[index], verbose=rank == 0)
+    info = {
+        'time': elapsed_time,
+        'nosl': num_of_solution_updates[:index+1],
+        'residual': residual[:index+1],
+    }
+    return distribute(x, comm, A.local_N, layout), info
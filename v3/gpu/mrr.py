@@ -8,18 +8,17 @@ from .common import start, finish, init, MultiGpu
 def mrr(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None) -> tuple:
     # 初期化
     T = float64
-    MultiGpu.init()
     b, x, maxiter, b_norm, N, residual, num_of_solution_updates = init(b, x, maxiter)
-    MultiGpu.alloc(A, b, T)
+    A = MultiGpu.prepare(A, b, T)
 
     # 初期残差
-    r = b - MultiGpu.dot(A, x)
+    r = b - A.dot(x)
     residual[0] = norm(r) / b_norm
 
     # 初期反復
     i = 0
     start_time = start(method_name='MrR + GPU')
-    Ar = MultiGpu.dot(A, r)
+    Ar = A.dot(r)
     zeta = dot(r, Ar) / dot(Ar, Ar)
     y = zeta * Ar
     z = -zeta * r
@@ -37,7 +36,7 @@ def mrr(A, b, x=None, tol=1e-05, maxiter=None, M=None, callback=None, atol=None)
             break
 
         # 解の更新
-        Ar = MultiGpu.dot(A, r)
+        Ar = A.dot(r)
         mu = dot(y, y)
         nu = dot(y, Ar)
         gamma = nu / mu